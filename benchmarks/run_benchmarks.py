@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'feature_gen')]
+
+from synthetic import make_tracking, make_x, make_predictions
+from nearest_defenders_and_offesnive import (find_closest_players_and_ballcarrier_indicator,
+                                             find_closest_players_and_ballcarrier_indicator_batch)
+from num_offensive_player_between import (num_offensive_players_between_tackler_and_ballCarrier,
+                                          num_offensive_players_between_batch)
+from expected_intersection import add_expected_intersection
+from plotter2 import NflPlayAnimator
+from sprite_renderer import SpriteRenderer, write_frames
+from tracking_loader import load_tracking
+
+
+# Number of games per data size, each game has PLAYS_PER_GAME plays of 30-60 frames
+SIZES = {'small': 1, 'medium': 4, 'large': 16}
+PLAYS_PER_GAME = 10
+
+# Row-wise reference implementations are only timed on this many rows
+ROWWISE_MAX_ROWS = 300
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def measure(fn, n_items, unit):
+    """
+    Wall time and throughput in unit/s of one untraced run of fn, and the peak traced memory in MB of a
+    second run (tracemalloc slows down allocation heavy code, so it is kept out of the timed run).
+    """
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'n': n_items, 'unit': unit, 'seconds': seconds, 'throughput': n_items / seconds, 'peak_mb': peak / 1024**2}
+
+
+def bench_features(tracking, x):
+    x_small = x.iloc[:ROWWISE_MAX_ROWS]
+    return {
+        'closest_players_rowwise': measure(
+            lambda: x_small.apply(lambda row: find_closest_players_and_ballcarrier_indicator(row, tracking), axis=1),
+            len(x_small), 'rows'),
+        'closest_players_batch': measure(
+            lambda: find_closest_players_and_ballcarrier_indicator_batch(x, tracking), len(x), 'rows'),
+        'num_off_player_between_rowwise': measure(
+            lambda: x_small.apply(lambda row: num_offensive_players_between_tackler_and_ballCarrier(row, tracking), axis=1),
+            len(x_small), 'rows'),
+        'num_off_player_between_batch': measure(
+            lambda: num_offensive_players_between_batch(x, tracking), len(x), 'rows'),
+        'num_off_player_between_batch_cone': measure(
+            lambda: num_offensive_players_between_batch(x, tracking, corridor='cone'), len(x), 'rows'),
+        'expected_intersection': measure(lambda: add_expected_intersection(x.copy()), len(x), 'rows'),
+    }
+
+
+def bench_plot_players(tracking, plays, x):
+    """Animation frame callback of plotter2 for the first play, without loading anything from disk."""
+    play = plays.iloc[0]
+    df = tracking.query('gameId==@play.gameId & playId==@play.playId').reset_index(drop=True)
+    df_play_pred = make_predictions(x.query('gameId==@play.gameId & playId==@play.playId'))
+    n_frames = int(df.frameId.max()) + 1
+
+    animator = NflPlayAnimator()
+    t1, t2 = animator._teams(df, {'possessionTeam': play.possessionTeam})
+    fig, ax = plt.subplots()
+    artists = [ax.plot([], [])[0] for _ in range(6)]
+
+    def run():
+        arrays = animator._frame_arrays(df, n_frames, t1, t2, play.tacklerId,
+                                        play.ballCarrierId, df_play_pred, play.absoluteYardlineNumber, 'right')
+        for frame in range(n_frames):
+            animator._plot_players(arrays, *artists, frame)
+
+    result = measure(run, n_frames, 'frames')
+    plt.close(fig)
+
+    # The same frames drawn by the sprite backend and encoded to a gif
+    renderer = SpriteRenderer()
+    lines = {'los': play.absoluteYardlineNumber, 'first_down': play.absoluteYardlineNumber + 10}
+
+    def run_sprites():
+        arrays = animator._frame_arrays(df, n_frames, t1, t2, play.tacklerId,
+                                        play.ballCarrierId, df_play_pred, play.absoluteYardlineNumber, 'right')
+        with tempfile.TemporaryDirectory() as tmp:
+            write_frames(renderer.frames(arrays, lines, n_frames), os.path.join(tmp, 'play.gif'))
+
+    return {'plot_players': result, 'sprite_gif': measure(run_sprites, n_frames, 'frames')}
+
+
+def bench_loader(tracking):
+    with tempfile.TemporaryDirectory() as tmp:
+        tracking.to_csv(os.path.join(tmp, 'tracking_week_1.csv'), index=False)
+        return {'tracking_loader': measure(lambda: load_tracking(tmp, weeks=[1], normalize=True, verbose=False),
+                                           len(tracking), 'rows')}
+
+
+def run_benchmarks(sizes):
+    results = []
+    for size in sizes:
+        tracking, plays = make_tracking(n_games=SIZES[size], plays_per_game=PLAYS_PER_GAME)
+        x = make_x(tracking, plays)
+        print(f'{size}: {len(tracking):,} tracking rows, {len(x):,} x rows')
+
+        benches = {}
+        benches.update(bench_features(tracking, x))
+        benches.update(bench_plot_players(tracking, plays, x))
+        benches.update(bench_loader(tracking))
+
+        for name, result in benches.items():
+            print(f"  {name:<36} {result['throughput']:>12,.0f} {result['unit']}/s   peak {result['peak_mb']:8.1f} MB")
+            results.append({'benchmark': name, 'size': size, **result})
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results, previous_path):
+    """Print the throughput of this run relative to a previous results file."""
+    with open(previous_path) as f:
+        previous = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+    print(f'Compared to {previous_path}:')
+    for r in results:
+        prev = previous.get((r['benchmark'], r['size']))
+        if prev is not None:
+            print(f"  {r['benchmark']:<36} {r['size']:<8} {r['throughput'] / prev['throughput']:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the feature generation and rendering hot paths on synthetic data.')
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium'], choices=list(SIZES))
+    parser.add_argument('--out', default=None, help='results json (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='previous results json to compare against')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f'Saved results to {out}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
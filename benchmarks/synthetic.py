@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+
+TRACKING_COLS = ['gameId', 'playId', 'nflId', 'displayName', 'frameId', 'time', 'jerseyNumber', 'club',
+                 'playDirection', 'x', 'y', 's', 'a', 'dis', 'o', 'dir', 'event']
+
+CLUBS = ['ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET', 'GB', 'HOU', 'IND', 'JAX', 'KC',
+         'LA', 'LAC', 'LV', 'MIA', 'MIN', 'NE', 'NO', 'NYG', 'NYJ', 'PHI', 'PIT', 'SEA', 'SF', 'TB', 'TEN', 'WAS']
+
+
+def _play_tracking(rng, gameId, playId, n_frames, offense, defense, clubs, start_time):
+    """Tracking rows of one play: 11 offensive and 11 defensive players plus the football, moving smoothly."""
+    playDirection = 'left' if rng.random() < 0.5 else 'right'
+    sign = -1 if playDirection == 'left' else 1
+    los = rng.uniform(20, 100)
+
+    # Offense lines up behind the line of scrimmage, defense in front of it
+    start_x = np.r_[los - sign * rng.uniform(0.5, 8, 11), los + sign * rng.uniform(0.5, 15, 11), los - sign]
+    start_y = np.r_[rng.uniform(10, 43, 22), 26.65]
+
+    # Speeds ramp up after the snap, headings drift slowly
+    heading = np.r_[np.full(11, 90 if sign == 1 else 270), np.full(11, 270 if sign == 1 else 90), 90 if sign == 1 else 270]
+    heading = heading + rng.normal(0, 30, 23)
+    dirs = (heading[None, :] + np.cumsum(rng.normal(0, 4, (n_frames, 23)), axis=0)) % 360
+    speeds = np.clip(np.linspace(0, 1, n_frames)[:, None] * rng.uniform(2, 9, 23) + rng.normal(0, 0.3, (n_frames, 23)), 0, 11)
+    dis = speeds * 0.1
+    dir_rad = np.radians(dirs)
+    xs = np.clip(start_x + np.cumsum(dis * np.sin(dir_rad), axis=0), 0, 120)
+    ys = np.clip(start_y + np.cumsum(dis * np.cos(dir_rad), axis=0), 0, 53.3)
+    accel = np.abs(np.diff(speeds, axis=0, prepend=speeds[:1])) * 10
+
+    events = np.full(n_frames, np.nan, dtype=object)
+    events[min(5, n_frames - 1)] = 'ball_snap'
+    events[min(10, n_frames - 1)] = 'handoff'
+    events[max(n_frames - 5, 0)] = 'tackle'
+
+    nflIds = np.r_[offense, defense, np.nan]
+    frameIds = np.arange(1, n_frames + 1)
+    times = (start_time + pd.to_timedelta(frameIds * 100, unit='ms')).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    # Rows ordered like the Kaggle csv files: by player, then by frame
+    return pd.DataFrame({
+        'gameId': gameId,
+        'playId': playId,
+        'nflId': np.repeat(nflIds, n_frames),
+        'displayName': np.repeat([f'Player {int(i)}' for i in nflIds[:-1]] + ['football'], n_frames),
+        'frameId': np.tile(frameIds, 23),
+        'time': np.tile(times, 23),
+        'jerseyNumber': np.repeat(np.r_[rng.integers(1, 99, 22), np.nan], n_frames),
+        'club': np.repeat([clubs[0]] * 11 + [clubs[1]] * 11 + ['football'], n_frames),
+        'playDirection': playDirection,
+        'x': xs.T.ravel().round(2),
+        'y': ys.T.ravel().round(2),
+        's': speeds.T.ravel().round(2),
+        'a': accel.T.ravel().round(2),
+        'dis': dis.T.ravel().round(2),
+        'o': ((dirs + rng.normal(0, 20, dirs.shape)) % 360).T.ravel().round(2),
+        'dir': dirs.T.ravel().round(2),
+        'event': np.tile(events, 23),
+    })
+
+
+def make_tracking(n_games=2, plays_per_game=10, frames_per_play=(30, 60), seed=0):
+    """
+    Synthetic tracking data with the columns of tracking_week_N.csv, together with a plays DataFrame holding
+    gameId, playId, ballCarrierId, tacklerId, possessionTeam and absoluteYardlineNumber of every play.
+    """
+    rng = np.random.default_rng(seed)
+    tracking, plays = [], []
+
+    for g in range(n_games):
+        gameId = 2022090800 + g
+        clubs = list(rng.choice(CLUBS, 2, replace=False))
+        offense = 40000 + 100 * g + np.arange(11)
+        defense = 50000 + 100 * g + np.arange(11)
+        start_time = pd.Timestamp('2022-09-08 20:20:00') + pd.Timedelta(days=7 * g)
+
+        for p in range(plays_per_game):
+            playId = 56 + 25 * p
+            n_frames = int(rng.integers(frames_per_play[0], frames_per_play[1] + 1))
+            df_play = _play_tracking(rng, gameId, playId, n_frames, offense, defense, clubs,
+                                     start_time + pd.Timedelta(minutes=p))
+            tracking.append(df_play)
+
+            first = df_play.iloc[0]
+            los = first.x if first.playDirection == 'right' else 110 - first.x
+            plays.append({'gameId': gameId, 'playId': playId, 'ballCarrierId': int(rng.choice(offense[1:])),
+                          'tacklerId': int(rng.choice(defense)), 'possessionTeam': clubs[0],
+                          'absoluteYardlineNumber': float(round(los))})
+
+    return pd.concat(tracking, ignore_index=True), pd.DataFrame(plays)
+
+
+def make_x(tracking, plays):
+    """
+    One row per (play, frame, tackler) with tackler / ballCarrier kinematics, the columns of x.pkl as used by the
+    feature_gen scripts and the expected intersection feature.
+    """
+    frames = tracking.drop_duplicates(['gameId', 'playId', 'frameId'])[['gameId', 'playId', 'frameId']]
+    x = frames.merge(plays[['gameId', 'playId', 'tacklerId', 'ballCarrierId', 'absoluteYardlineNumber']],
+                     on=['gameId', 'playId'])
+
+    track_cols = ['gameId', 'playId', 'frameId', 'nflId', 'x', 'y', 's', 'a', 'dis', 'o', 'dir']
+    for role, id_col in [('tackler', 'tacklerId'), ('ballCarrier', 'ballCarrierId')]:
+        rename = {col: f'{col}_{role}' for col in ['x', 'y', 's', 'a', 'dis', 'o', 'dir']}
+        rename['nflId'] = id_col
+        x = x.merge(tracking[track_cols].rename(rename, axis=1), on=['gameId', 'playId', 'frameId', id_col], how='left')
+
+    return x.sort_values(['gameId', 'playId', 'frameId'], ignore_index=True)
+
+
+def make_predictions(x, seed=0):
+    """Synthetic predictions.pkl: playResult and a noisy pred_playResult per (gameId, playId, frameId, tacklerId)."""
+    rng = np.random.default_rng(seed)
+    df_pred = x[['gameId', 'playId', 'frameId', 'tacklerId']].copy()
+    codes = df_pred.groupby(['gameId', 'playId']).ngroup().to_numpy()
+    playResult = rng.integers(-3, 20, codes.max() + 1).astype(float)[codes]
+    df_pred['playResult'] = playResult
+    df_pred['pred_playResult'] = playResult + rng.normal(0, 3, len(df_pred))
+    return df_pred
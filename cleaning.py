@@ -0,0 +1,141 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from tracking_loader import load_tracking, add_play_key, WEEK_START, WEEK_END
+from tracking_store import write_tracking_store, numpy_dtypes
+from profiling import profiled
+
+
+# Plays with one of these events are removed
+FUMBLE_SACK_EVENTS = ['fumble', 'fumble_defense_recovered', 'fumble_offense_recovered', 'qb_sack']
+
+# Plays where the tackle was incorrectly assigned
+# 20220918073597: intentional safety to end game -> -26 yard tackle
+DROP_KEYS = [20220925103356, 20220918073597]
+
+# Frames recorded after the end of play event (tackle, out of bounds, ...)
+FRAMES_AFTER_END = 4
+
+# Columns of df_tracking that are not in tracking_new.pkl
+TRACKING_NEW_DROP = ['playDirection', 'time']
+
+
+def remove_missed_tackles(df_tackles):
+    """Tackles without missed tackles and forced fumbles, as tacklerId rows."""
+    df = df_tackles.query('not pff_missedTackle==1 and not forcedFumble==1')
+    return df.drop(['forcedFumble', 'pff_missedTackle'], axis=1).rename({'nflId': 'tacklerId'}, axis=1)
+
+
+def remove_penalty_plays(df, df_plays):
+    """Rows of plays without a foul that nullified or affected the play."""
+    clean_keys = df_plays.loc[df_plays['foulName1'].isna() & (df_plays['playNullifiedByPenalty'] == 'N'), 'key']
+    return df[df['key'].isin(clean_keys)]
+
+
+def remove_event_plays(df, df_tracking, events=FUMBLE_SACK_EVENTS):
+    """Rows of plays where none of the events occur in the tracking data (fumbles and sacks by default)."""
+    event_keys = df_tracking.loc[df_tracking['event'].isin(events).to_numpy(), 'key'].unique()
+    return df[~df['key'].isin(event_keys)]
+
+
+@profiled()
+def clean_tackles(df_tackles, df_plays, df_tracking, drop_keys=DROP_KEYS):
+    """
+    The tackles of the data cleaning cells of model.ipynb: missed tackles, fumbles, penalties, sacks and
+    incorrectly assigned tackles removed, with ballCarrierId, playResult, absoluteYardlineNumber (normalized
+    to go right) and playDirection of the play.
+    """
+    df = remove_missed_tackles(df_tackles)
+    df = remove_penalty_plays(df, df_plays)
+
+    cols = ['key', 'ballCarrierId', 'playResult', 'absoluteYardlineNumber']
+    df = df.merge(df_plays[cols], on='key', how='left')
+    df = df[['key', 'gameId', 'playId', 'tacklerId', 'ballCarrierId', 'tackle', 'assist', 'playResult', 'absoluteYardlineNumber']]
+
+    directions = df_tracking.drop_duplicates(subset='key')[['key', 'playDirection']]
+    df = df.merge(directions, on='key', how='left')
+    df = df[~df['key'].isin(drop_keys)]
+    df = remove_event_plays(df, df_tracking)
+
+    left = (df['playDirection'] == 'left').to_numpy()
+    df.loc[left, 'absoluteYardlineNumber'] = 110 - df.loc[left, 'absoluteYardlineNumber']
+    return df.reset_index(drop=True)
+
+
+def _play_rows(df_tracking, keys):
+    """Tracking rows of the plays keys (in tracking order), with per-play row position and max frameId."""
+    rows = df_tracking[df_tracking['key'].isin(keys).to_numpy()]
+    grouped = rows.groupby('key', sort=False)
+    return rows, grouped.cumcount().to_numpy(), grouped['frameId'].transform('max').to_numpy()
+
+
+def end_of_play_events(df_tracking, keys):
+    """
+    Event FRAMES_AFTER_END frames before the last frame of every play, in one grouped pass: the row at
+    position frameId_max - 5 of the play, as looked up per play in model.ipynb. NaN where there is none.
+    """
+    rows, position, frameId_max = _play_rows(df_tracking, keys)
+    at_offset = position == frameId_max - FRAMES_AFTER_END - 1
+    events = pd.Series(rows['event'].to_numpy()[at_offset], index=rows['key'].to_numpy()[at_offset])
+    return events.reindex(keys)
+
+
+def event_counts(events):
+    """eventCounts of model.ipynb: how often each end of play event occurs (NaN included)."""
+    return events.value_counts(dropna=False).to_dict()
+
+
+@profiled()
+def trim_plays(df_tracking, keys, keys_without_frames_after=()):
+    """
+    Tracking rows of the plays keys without the FRAMES_AFTER_END frames recorded after the end of play,
+    except for keys_without_frames_after. Plays are in the order of keys, like df_tracking_new of model.ipynb.
+    """
+    rows, _, frameId_max = _play_rows(df_tracking, keys)
+    keep = (rows['frameId'].to_numpy() <= frameId_max - FRAMES_AFTER_END) | rows['key'].isin(keys_without_frames_after).to_numpy()
+    rows = rows[keep]
+
+    order = np.argsort(pd.Categorical(rows['key'], categories=keys).codes, kind='stable')
+    return rows.iloc[order].reset_index(drop=True)
+
+
+def clean_tracking(df_tracking, df):
+    """
+    Trimmed tracking data of the cleaned plays df in the tracking_new.pkl schema used by the feature_gen
+    scripts, together with the eventCounts and the keys without frames after the end of play (nanKeys).
+    Nullable columns (the Int32 nflId of load_tracking) are written as float64 with NaN, like the notebook.
+    """
+    keys = df['key'].unique()
+    events = end_of_play_events(df_tracking, keys)
+    nanKeys = [int(key) for key in events.index[events.isna()]]
+
+    df_tracking_new = trim_plays(df_tracking, keys, nanKeys)
+    df_tracking_new = df_tracking_new.drop([col for col in TRACKING_NEW_DROP if col in df_tracking_new.columns], axis=1)
+    return numpy_dtypes(df_tracking_new), event_counts(events), nanKeys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean and trim the plays and write tracking_new.pkl for the feature_gen scripts.')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--weeks', type=int, nargs='+', default=list(range(WEEK_START, WEEK_END+1)))
+    parser.add_argument('--out', default='data/tracking_new.pkl')
+    parser.add_argument('--store', default=None, help='also write a tracking store, e.g. data/tracking_new_store')
+    args = parser.parse_args()
+
+    df_tracking = load_tracking(args.data_dir, weeks=args.weeks, normalize=True)
+    df_plays = add_play_key(pd.read_csv(os.path.join(args.data_dir, 'plays.csv')))
+    df_tackles = add_play_key(pd.read_csv(os.path.join(args.data_dir, 'tackles.csv')))
+
+    df = clean_tackles(df_tackles, df_plays, df_tracking)
+    df_tracking_new, eventCounts, nanKeys = clean_tracking(df_tracking, df)
+    print(f'{df.key.nunique():,} plays, {len(df_tracking_new):,} tracking rows; keys without frames after the end of play: {nanKeys}')
+
+    df_tracking_new.to_pickle(args.out)
+    if args.store:
+        write_tracking_store(df_tracking_new, args.store, compact=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sequence_data import PADDING_VALUE
+
+
+def sequence_lengths(Y, padding_value=PADDING_VALUE):
+    """Number of non-padding frames of every padded sequence, len(y_true[y_true != padding_value]) in model.ipynb."""
+    return (Y.reshape(len(Y), -1) != padding_value).sum(axis=1)
+
+
+def unpad(padded, lengths):
+    """Flat values of the first lengths[i] frames of every padded sequence, in sequence order."""
+    padded = padded.reshape(len(padded), -1)
+    return padded[np.arange(padded.shape[1]) < np.asarray(lengths)[:, None]]
+
+
+def frame_buckets(lengths, n_buckets=10):
+    """
+    Percentile bucket of every frame of the flat sequences, in one pass. The bucket edges are those of the
+    evaluation loops of model.ipynb: floor(num_frames * i) for even and ceil(num_frames * i) for odd sequences.
+    """
+    lengths = np.asarray(lengths)
+    fractions = np.arange(n_buckets + 1) / n_buckets
+    scaled = lengths[:, None] * fractions
+    even = (np.arange(len(lengths)) % 2 == 0)[:, None]
+    edges = np.where(even, np.floor(scaled), np.ceil(scaled))
+
+    # Frame position within its sequence, compared with the inner edges of its sequence
+    seq = np.repeat(np.arange(len(lengths)), lengths)
+    step = np.arange(len(seq)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return (edges[seq, 1:-1] <= step[:, None]).sum(axis=1)
+
+
+def _r2(ss_res, ss_tot):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 1 - ss_res / ss_tot
+
+
+def _bootstrap_chunk(stats, n_sequences, n_replicates, seed):
+    """R-squared and MAE of n_replicates resamples (with replacement) of the sequences, for all buckets at once."""
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(n_sequences, np.full(n_sequences, 1 / n_sequences), size=n_replicates).astype('float64')
+    count, sum_y, sum_y2, sum_res2, sum_abs = [weights @ s for s in stats]
+    r2 = _r2(sum_res2, sum_y2 - sum_y**2 / count)
+    return r2, sum_abs / count
+
+
+def evaluate(y_true, y_pred, lengths, n_buckets=10, n_bootstrap=0, ci=0.95, workers=None, seed=0):
+    """
+    R-squared and MAE of all frames ('all') and of every percentile bucket of frames (index i for the i-th
+    to (i+1/n_buckets)-th part of every sequence), from flat (unpadded) y_true / y_pred of sequences with
+    the given lengths. With n_bootstrap > 0 sequences are resampled to add ci intervals (r2_low, r2_high,
+    mae_low, mae_high); all buckets are computed together per resample and resamples run on threads.
+    """
+    y_true = np.asarray(y_true, dtype='float64').ravel()
+    y_pred = np.asarray(y_pred, dtype='float64').ravel()
+    lengths = np.asarray(lengths)
+    buckets = frame_buckets(lengths, n_buckets)
+    labels = [i / n_buckets for i in range(n_buckets)]
+
+    # Point estimates: per bucket sums, 'all' is the extra last group
+    groups = np.r_[buckets, np.full(len(buckets), n_buckets)]
+    y, p = np.r_[y_true, y_true], np.r_[y_pred, y_pred]
+    count = np.bincount(groups, minlength=n_buckets + 1)
+    mean = np.bincount(groups, y, minlength=n_buckets + 1) / np.maximum(count, 1)
+    ss_res = np.bincount(groups, (y - p)**2, minlength=n_buckets + 1)
+    ss_tot = np.bincount(groups, (y - mean[groups])**2, minlength=n_buckets + 1)
+    abs_err = np.bincount(groups, np.abs(y - p), minlength=n_buckets + 1)
+
+    results = pd.DataFrame({'n_frames': count, 'r2': _r2(ss_res, ss_tot), 'mae': abs_err / np.maximum(count, 1)},
+                           index=pd.Index(labels + ['all'], name='bucket'))
+
+    if n_bootstrap > 0:
+        # Sufficient statistics per (sequence, bucket), so that a resample is a weighted sum over sequences
+        seq = np.repeat(np.arange(len(lengths)), lengths)
+        cells = np.r_[seq * (n_buckets + 1) + buckets, seq * (n_buckets + 1) + n_buckets]
+        n_cells = len(lengths) * (n_buckets + 1)
+        stats = [np.bincount(cells, values, minlength=n_cells).reshape(len(lengths), n_buckets + 1)
+                 for values in [np.ones(len(y)), y, y**2, (y - p)**2, np.abs(y - p)]]
+
+        chunk = 100
+        sizes = [min(chunk, n_bootstrap - start) for start in range(0, n_bootstrap, chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(lambda args: _bootstrap_chunk(stats, len(lengths), *args), zip(sizes, seeds)))
+        r2 = np.concatenate([c[0] for c in chunks])
+        mae = np.concatenate([c[1] for c in chunks])
+
+        alpha = (1 - ci) / 2
+        results['r2_low'], results['r2_high'] = np.nanquantile(r2, [alpha, 1 - alpha], axis=0)
+        results['mae_low'], results['mae_high'] = np.nanquantile(mae, [alpha, 1 - alpha], axis=0)
+
+    return results
+
+
+def evaluate_padded(Y, predictions, padding_value=PADDING_VALUE, **kwargs):
+    """evaluate() of padded (n_sequences, max_len, 1) targets and predictions, e.g. Y_test and model.predict(X_test)."""
+    lengths = sequence_lengths(Y, padding_value)
+    return evaluate(unpad(Y, lengths), unpad(predictions, lengths), lengths, **kwargs)
@@ -0,0 +1,199 @@
+import hashlib
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+
+from tracking_store import TrackingStore
+from profiling import profiled
+
+
+CACHE_DIR = 'data/feature_cache'
+MAX_CACHE_BYTES = 2 * 1024**3
+
+
+def code_hash(*fns):
+    """Hash of the source code of a feature function and the helpers it depends on."""
+    digest = hashlib.sha1()
+    for fn in fns:
+        digest.update(inspect.getsource(fn).encode())
+    return digest.hexdigest()
+
+
+def data_hash(df):
+    """Hash of the values (not the index) of df, so that the rows of a game hash the same wherever they are in x."""
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+class Feature():
+    """
+    A registered feature: compute(x_game) (or compute(x_game, tracking_game) with tracking_columns) returns
+    the outputs columns for the rows of one game, as a DataFrame or Series aligned with x_game.
+    """
+    def __init__(self, name, compute, inputs, outputs, tracking_columns=None, depends=()):
+        self.name = name
+        self.compute = compute
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.tracking_columns = tracking_columns
+        self.code_hash = code_hash(compute, *depends)
+
+    def key(self, x_game, tracking_game=None):
+        """Cache key of the feature for one game: hash of the feature code, its input columns and tracking rows."""
+        parts = [self.code_hash, data_hash(x_game[self.inputs])]
+        if tracking_game is not None:
+            parts.append(data_hash(tracking_game))
+        return hashlib.sha1(''.join(parts).encode()).hexdigest()[:24]
+
+    def __call__(self, x_game, tracking_game=None):
+        results = self.compute(x_game) if self.tracking_columns is None else self.compute(x_game, tracking_game)
+        if isinstance(results, pd.Series):
+            results = results.to_frame(self.outputs[0])
+        return {col: results[col].to_numpy() for col in self.outputs}
+
+
+class FeatureRegistry():
+    """Features by name, in registration order. Inputs of a feature may be outputs of earlier features."""
+    def __init__(self):
+        self.features = {}
+
+    def register(self, inputs, outputs, name=None, tracking_columns=None, depends=()):
+        """Decorator declaring a feature function with its input columns and the columns it computes."""
+        def decorator(fn):
+            feature_name = name or fn.__name__
+            self.features[feature_name] = Feature(feature_name, fn, inputs, outputs, tracking_columns, depends)
+            return fn
+        return decorator
+
+    def resolve(self, names, columns):
+        """The features names (default all) plus the features computing their missing inputs, in registration order."""
+        producers = {col: feature for feature in self.features.values() for col in feature.outputs}
+        needed = set(names or self.features)
+        todo = list(needed)
+        while todo:
+            for col in self.features[todo.pop()].inputs:
+                if col not in columns:
+                    if col not in producers:
+                        raise KeyError(f"Input column '{col}' is neither in x nor computed by a registered feature")
+                    if producers[col].name not in needed:
+                        needed.add(producers[col].name)
+                        todo.append(producers[col].name)
+        return [feature for name, feature in self.features.items() if name in needed]
+
+
+class FeatureCache():
+    """
+    Content-addressed cache of feature results: one npz per (feature, game) named after Feature.key, so a
+    changed feature or changed game data never hits a stale entry. Entries are touched on every hit and the
+    least recently used ones are removed when the cache grows beyond max_bytes.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path(self, name, key):
+        return os.path.join(self.cache_dir, name, f'{key}.npz')
+
+    def get(self, name, key):
+        path = self.path(name, key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        with np.load(path) as f:
+            return {col: f[col] for col in f.files}
+
+    def put(self, name, key, columns):
+        path = self.path(name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first, an existing entry is always complete
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        """(last use, size, path) of every entry, least recently used first."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if file.endswith('.npz'):
+                    stat = os.stat(os.path.join(root, file))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, file)))
+        return sorted(entries)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits into max_bytes, returns the number removed."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+def _game_tracking(tracking, gameId, columns):
+    if isinstance(tracking, TrackingStore):
+        return tracking.load_games([gameId], columns=columns)
+    return tracking.get_group(gameId)[columns].reset_index(drop=True)
+
+
+@profiled()
+def build_features(x, registry, names=None, cache=None, tracking=None):
+    """
+    x with the columns of the features names (default all registered) and the features they depend on, computed
+    game by game. Cells (feature, game) whose code and input data are unchanged are read from the cache, only
+    stale cells are computed. Results are written by row position into one array per column, so nothing is merged
+    on (gameId, playId, frameId, tacklerId); their dtype is promoted across games. tracking (store path,
+    TrackingStore or DataFrame) is only needed by features with tracking_columns.
+    """
+    cache = cache or FeatureCache()
+    features = registry.resolve(names, x.columns)
+    if isinstance(tracking, str):
+        tracking = TrackingStore(tracking)
+    elif isinstance(tracking, pd.DataFrame):
+        tracking = tracking.groupby('gameId', sort=False)
+
+    tracking_columns = sorted({col for feature in features for col in feature.tracking_columns or []})
+    columns = {}
+    hits = 0
+
+    for gameId, rows in x.groupby('gameId', sort=True).indices.items():
+        x_game = x.iloc[rows].reset_index(drop=True)
+        tracking_game = None
+        for feature in features:
+            if feature.tracking_columns is not None and tracking_game is None:
+                tracking_game = _game_tracking(tracking, gameId, tracking_columns)
+            feature_tracking = tracking_game[feature.tracking_columns] if feature.tracking_columns is not None else None
+
+            key = feature.key(x_game, feature_tracking)
+            results = cache.get(feature.name, key)
+            if results is None:
+                results = feature(x_game, feature_tracking)
+                cache.put(feature.name, key, results)
+            else:
+                hits += 1
+
+            # Later features of the game may use these columns as inputs
+            for col, values in results.items():
+                x_game[col] = values
+                if col not in columns:
+                    columns[col] = np.empty(len(x), dtype=values.dtype)
+                elif np.result_type(columns[col], values) != columns[col].dtype:
+                    # Promote the column when a game needs a wider dtype, e.g. NaN after integer counts
+                    columns[col] = columns[col].astype(np.result_type(columns[col], values))
+                columns[col][rows] = values
+
+    n_cells = len(features) * x['gameId'].nunique()
+    print(f'{hits} of {n_cells} (feature, game) cells cached, {n_cells - hits} computed; '
+          f'{cache.evict()} cache entries evicted')
+
+    x = x.copy(deep=False)
+    for col, values in columns.items():
+        x[col] = values
+    return x
@@ -0,0 +1,172 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from frame_arrays import FrameArrays, FRAME_KEYS, k_smallest
+from num_offensive_player_between import _in_corridor
+from expected_intersection import calculate_intersection_batch, causal_smooth_by_play
+from tracking_loader import load_tracking
+from sequence_data import RaggedSequences, length_buckets, frame_index
+from streaming_inference import StreamingPredictor, FEATURE_COLS, MODEL_PATH
+from profiling import profiled
+
+DEFENDER_KEYS = ['gameId', 'playId', 'tacklerId']
+TRACKING_COLS = FRAME_KEYS + ['nflId', 'club', 'playDirection', 'x', 'y', 'o', 'dir']
+
+
+def _frame_chunk_features(frames, fi, ballCarrier_slot, los, football):
+    """
+    Features of every defender of the frames fi that need the other players of the frame, from one
+    (n_frames, n_players, n_players) pairwise distance matrix of the chunk.
+    """
+    clubs = frames.club[fi]
+    x, y = frames.x[fi], frames.y[fi]
+    frame_rows = np.arange(len(fi))
+    ballCarrier_club = clubs[frame_rows, ballCarrier_slot]
+
+    dist = np.sqrt((x[:, :, None] - x[:, None, :])**2 + (y[:, :, None] - y[:, None, :])**2)
+
+    # One row per defender: every player of the non-ballCarrier club (the football is no defender)
+    is_defender = (clubs != ballCarrier_club[:, None]) & (clubs >= 0) & (clubs != football)
+    r, slot = np.nonzero(is_defender)
+    b = ballCarrier_slot[r]
+    player_dist = dist[r, slot]
+    players = np.arange(clubs.shape[1])
+
+    # Closest defenders excluding the defender itself, closest offensive players (including the football)
+    defender_club = clubs[r, slot][:, None]
+    closest_defenders, _ = k_smallest(player_dist, (clubs[r] == defender_club) & (players != slot[:, None]), 3)
+    closest_offensive, offensive_slots = k_smallest(player_dist, (clubs[r] != defender_club) & (clubs[r] >= 0), 3)
+
+    offensive = (clubs[r] == ballCarrier_club[r][:, None]) & (players != b[:, None])
+    inside = _in_corridor(x[r], y[r], x[r, slot], y[r, slot], x[r, b], y[r, b], 'box', 2)
+
+    return pd.DataFrame({
+        'frame': fi[r],
+        'tacklerId': frames.nflId[fi[r], slot],
+        'x_tackler': x[r, slot], 'y_tackler': y[r, slot],
+        'o_tackler': frames.o[fi[r], slot], 'dir_tackler': frames.dir[fi[r], slot],
+        'x_ballCarrier': x[r, b], 'y_ballCarrier': y[r, b],
+        'o_ballCarrier': frames.o[fi[r], b], 'dir_ballCarrier': frames.dir[fi[r], b],
+        'absoluteYardlineNumber': los[r],
+        'dist_ballCarrier_tackler': player_dist[np.arange(len(r)), b],
+        'closest_defender_1': closest_defenders[:, 0], 'closest_defender_2': closest_defenders[:, 1],
+        'closest_defender_3': closest_defenders[:, 2],
+        'closest_offensive_1': closest_offensive[:, 0], 'closest_offensive_2': closest_offensive[:, 1],
+        'closest_offensive_3': closest_offensive[:, 2],
+        'ballcarrier_closest_indicator': (offensive_slots == b[:, None]).any(axis=1).astype('int64'),
+        'num_off_player_between': (offensive & inside).sum(axis=1),
+    })
+
+
+@profiled()
+def all_defender_features(tracking_df, plays, frames=None, chunk_size=20000, sigma=2):
+    """
+    The streaming model features (FEATURE_COLS) of every defender against the ballCarrier in every frame,
+    instead of only the tackler of tackles.csv. tracking_df is normalized to go right (like tracking_new.pkl),
+    plays holds gameId, playId, ballCarrierId and the normalized absoluteYardlineNumber.
+    Returns one row per (gameId, playId, frameId, tacklerId), sorted by defender and frame.
+    """
+    if frames is None:
+        frames = FrameArrays(tracking_df, columns=('nflId', 'x', 'y', 'o', 'dir'))
+    football = list(frames.clubs).index('football') if 'football' in list(frames.clubs) else -2
+
+    frame_keys = frames.index.to_frame(index=False)
+    play_info = frame_keys.merge(plays[['gameId', 'playId', 'ballCarrierId', 'absoluteYardlineNumber']],
+                                 on=['gameId', 'playId'], how='left')
+    ballCarrier_slot = frames.player_slot(np.arange(frames.n_frames), play_info['ballCarrierId'].to_numpy(dtype='float64'))
+    los = play_info['absoluteYardlineNumber'].to_numpy(dtype='float64')
+
+    # Frames of the plays in plays where the ballCarrier is tracked
+    valid = np.flatnonzero(ballCarrier_slot >= 0)
+    chunks = [_frame_chunk_features(frames, fi, ballCarrier_slot[fi], los[fi], football)
+              for fi in np.array_split(valid, max(1, int(np.ceil(len(valid) / chunk_size))))]
+    x = pd.concat(chunks, ignore_index=True)
+    x = pd.concat([frame_keys.iloc[x.pop('frame')].reset_index(drop=True), x], axis=1)
+    x['tacklerId'] = x['tacklerId'].astype('int64')
+    x = x.sort_values(DEFENDER_KEYS + ['frameId'], kind='stable', ignore_index=True)
+
+    x['tacklerDepth'] = x['x_tackler'] - x['absoluteYardlineNumber']
+    x['ballCarrierDepth'] = x['x_ballCarrier'] - x['absoluteYardlineNumber']
+    x['dist_ballCarrier_tackler_x'] = x['x_tackler'] - x['x_ballCarrier']
+
+    # Previous frame of the same defender, rows are sorted by defender and frame
+    first = np.r_[True, (x[DEFENDER_KEYS].to_numpy()[1:] != x[DEFENDER_KEYS].to_numpy()[:-1]).any(axis=1)]
+    prev_distance = np.where(first, np.nan, np.roll(x['dist_ballCarrier_tackler'].to_numpy(), 1))
+    prev_distance_x = np.where(first, np.nan, np.roll(x['dist_ballCarrier_tackler_x'].to_numpy(), 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x['convergence_rate_by_tackler'] = np.where(first, 1, prev_distance / x['dist_ballCarrier_tackler'])
+        x['convergence_rate_x_by_tackler'] = np.where(first, 1, prev_distance_x / x['dist_ballCarrier_tackler_x'])
+    x['s_tacklerTowardBallCarrier_by_tackler'] = np.where(first, 0, (prev_distance - x['dist_ballCarrier_tackler']) / .1)
+
+    x['sin_o_sum'] = np.sin(np.radians(x['o_tackler'])) + np.sin(np.radians(x['o_ballCarrier']))
+    x['sin_dir_sum'] = np.sin(np.radians(x['dir_tackler'])) + np.sin(np.radians(x['dir_ballCarrier']))
+
+    x['expected_intersection_x'] = calculate_intersection_batch(
+        x['x_tackler'], x['y_tackler'], x['dir_tackler'],
+        x['x_ballCarrier'], x['y_ballCarrier'], x['dir_ballCarrier'],
+        x['absoluteYardlineNumber'])
+    x['causal_smoothed_expected_intersection_x'] = causal_smooth_by_play(x, 'expected_intersection_x', sigma=sigma,
+                                                                        keys=DEFENDER_KEYS)
+
+    return x[FRAME_KEYS + ['tacklerId'] + FEATURE_COLS]
+
+
+@profiled()
+def predict_all_defenders(features, predictor, batch_size=1024):
+    """
+    pred_playResult for every row of all_defender_features, running the sequences of all defenders through
+    the LSTM of predictor (StreamingPredictor.load) in batches of similar length.
+    """
+    scaled = (features[FEATURE_COLS].to_numpy(dtype='float64') - predictor.scaler_mean) / predictor.scaler_scale
+    scaled[~np.isfinite(scaled)] = 0
+    scaled = pd.concat([features[DEFENDER_KEYS], pd.DataFrame(scaled, columns=FEATURE_COLS, index=features.index)], axis=1)
+    seqs = RaggedSequences.from_frame(scaled, FEATURE_COLS, target_col=None)
+
+    # Sequences are in the (sorted) row order of features, so flat frame i is row i
+    pred = np.empty(len(features))
+    for idx in length_buckets(seqs, batch_size, shuffle=False):
+        X, _ = seqs.pad(idx, padding_value=0)
+        y = predictor.lstm.predict(X)
+        pred[frame_index(seqs.offsets, idx)] = y[np.arange(y.shape[1]) < seqs.lengths[idx][:, None]]
+
+    results = features[FRAME_KEYS + ['tacklerId']].copy()
+    results['pred_playResult'] = pred
+    return results
+
+
+def load_week(data_dir, week):
+    """Normalized tracking data of a week and the plays with their normalized line of scrimmage."""
+    df_tracking = load_tracking(data_dir, weeks=[week], normalize=True, add_key=False, usecols=TRACKING_COLS)
+    df_plays = pd.read_csv(os.path.join(data_dir, 'plays.csv'),
+                           usecols=['gameId', 'playId', 'ballCarrierId', 'absoluteYardlineNumber'])
+
+    directions = df_tracking.drop_duplicates(['gameId', 'playId'])[['gameId', 'playId', 'playDirection']]
+    plays = df_plays.merge(directions, on=['gameId', 'playId'])
+    left = (plays['playDirection'] == 'left').to_numpy()
+    plays.loc[left, 'absoluteYardlineNumber'] = 110 - plays.loc[left, 'absoluteYardlineNumber']
+    return df_tracking, plays
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Features and predictions for all 11 defenders in every frame of a week.')
+    parser.add_argument('--week', type=int, default=1)
+    parser.add_argument('--data-dir', default='./data')
+    parser.add_argument('--model', default=None, help=f'predict with this StreamingPredictor npz (e.g. {MODEL_PATH})')
+    args = parser.parse_args()
+
+    df_tracking, plays = load_week(args.data_dir, args.week)
+    x = all_defender_features(df_tracking, plays)
+    del df_tracking
+    x.to_pickle(f'./x_all_defenders_week{args.week}.pkl')
+
+    if args.model:
+        predictions = predict_all_defenders(x, StreamingPredictor.load(args.model))
+        predictions.to_pickle(f'./predictions_all_defenders_week{args.week}.pkl')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from scipy.ndimage import gaussian_filter1d
+
+from profiling import profiled
+
+# Intersections (relative to the line of scrimmage) outside this range fall back to the mean x of both players
+VALID_MIN = -10
+VALID_MAX = 50
+
+
+def calculate_intersection_batch(x_tackler, y_tackler, dir_tackler, x_ballCarrier, y_ballCarrier, dir_ballCarrier,
+                                 absoluteYardlineNumber):
+    """
+    Vectorized calculate_intersection of model.ipynb: x-coordinate (relative to the line of scrimmage) where the
+    heading lines of tackler and ballCarrier intersect. Parallel headings, intersections behind
+    either player and values outside [VALID_MIN, VALID_MAX] fall back to the mean x of both players.
+    Like the notebook, vertical headings (dir 0 or 180) get no special case: tan of the float angle is never
+    infinite, so they are lines with a very large slope.
+    """
+    x1, y1, dir1 = [np.asarray(a, dtype='float64') for a in (x_tackler, y_tackler, dir_tackler)]
+    x2, y2, dir2 = [np.asarray(a, dtype='float64') for a in (x_ballCarrier, y_ballCarrier, dir_ballCarrier)]
+    los = np.asarray(absoluteYardlineNumber, dtype='float64')
+
+    # Convert direction angles to radians and calculate slopes
+    dir1_rad = np.radians(90 - dir1)
+    dir2_rad = np.radians(90 - dir2)
+    m1 = np.tan(dir1_rad)
+    m2 = np.tan(dir2_rad)
+
+    fallback = (x1 + x2) / 2 - los
+
+    # Parallel lines have no intersection
+    parallel = m1 == m2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_inter = (m1 * x1 - m2 * x2 - y1 + y2) / (m1 - m2)
+    val = x_inter - los
+
+    # Intersection has to be in the direction both players are heading
+    valid = (((x_inter >= x1) == (np.cos(dir1_rad) >= 0)) & ((x_inter >= x2) == (np.cos(dir2_rad) >= 0)) &
+             (val >= VALID_MIN) & (val <= VALID_MAX) & ~parallel)
+
+    return np.where(valid, val, fallback)
+
+
+def smooth_by_play(df, col, sigma=2, keys=('gameId', 'playId')):
+    """
+    Same as df.groupby(keys)[col].transform(gaussian_filter1d) in one grouped pass: rows are ordered into
+    contiguous play segments, segments of equal length are stacked and filtered with one call per length.
+    """
+    codes = df.groupby(list(keys), sort=False).ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    values = df[col].to_numpy(dtype='float64')[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]])
+    lengths = np.diff(np.r_[starts, len(order)])
+
+    smoothed = np.empty(len(values))
+    for length in np.unique(lengths):
+        seg_starts = starts[lengths == length]
+        idx = seg_starts[:, None] + np.arange(length)
+        smoothed[idx] = gaussian_filter1d(values[idx], sigma=sigma, axis=1)
+
+    out = np.empty(len(values))
+    out[order] = smoothed
+    return out
+
+
+def causal_gaussian_weights(sigma=2, truncate=4.0):
+    """Weights of the current frame (lag 0) and the previous frames of a one-sided Gaussian filter."""
+    lags = np.arange(int(truncate * sigma + 0.5) + 1)
+    return np.exp(-0.5 * (lags / sigma)**2)
+
+
+def causal_smooth_by_play(df, col, sigma=2, keys=('gameId', 'playId')):
+    """
+    Causal counterpart of smooth_by_play: every frame is a weighted mean of itself and the earlier frames of
+    its play (causal_gaussian_weights, renormalized at the start of the play), so it is available live.
+    Rows of each play are expected in frame order.
+    """
+    codes = df.groupby(list(keys), sort=False).ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    values = df[col].to_numpy(dtype='float64')[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]])
+    lengths = np.diff(np.r_[starts, len(order)])
+    position = np.arange(len(order)) - np.repeat(starts, lengths)
+
+    weighted_sum = np.zeros(len(values))
+    weight_sum = np.zeros(len(values))
+    for lag, weight in enumerate(causal_gaussian_weights(sigma)):
+        rows = np.flatnonzero(position >= lag)
+        weighted_sum[rows] += weight * values[rows - lag]
+        weight_sum[rows] += weight
+
+    out = np.empty(len(values))
+    out[order] = weighted_sum / weight_sum
+    return out
+
+
+@profiled()
+def add_expected_intersection(x, sigma=2):
+    """Add the expected_intersection_x and smoothed_expected_intersection_x columns to x."""
+    x['expected_intersection_x'] = calculate_intersection_batch(
+        x['x_tackler'], x['y_tackler'], x['dir_tackler'],
+        x['x_ballCarrier'], x['y_ballCarrier'], x['dir_ballCarrier'],
+        x['absoluteYardlineNumber'])
+    x['smoothed_expected_intersection_x'] = smooth_by_play(x, 'expected_intersection_x', sigma=sigma)
+    return x
@@ -0,0 +1,157 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from frame_arrays import FrameArrays, FRAME_KEYS, k_smallest
+from expected_intersection import calculate_intersection_batch, smooth_by_play, causal_smooth_by_play
+from nearest_defenders_and_offesnive import find_closest_players_and_ballcarrier_indicator_batch, CLOSEST_PLAYER_COLS
+from num_offensive_player_between import num_offensive_players_between_batch, _in_corridor, TRACKING_COLS
+from feature_cache import FeatureRegistry, FeatureCache, build_features, CACHE_DIR, MAX_CACHE_BYTES
+from tracking_store import read_tracking
+from sharded_runner import feature_tracking_path
+
+TRACKING_STORE = './data/tracking_new_store'
+
+# Features of the model.ipynb feature engineering cells and of the feature_gen scripts, computed on x after
+# the tackler and ballCarrier tracking columns are merged in
+REGISTRY = FeatureRegistry()
+
+
+PLAY_KEYS = ['gameId', 'playId']
+TACKLER_KEYS = ['gameId', 'playId', 'tacklerId']
+
+
+def _play_order(x):
+    """Row order of x sorted by play and frame, the order the notebook computes per play features in."""
+    return x.sort_values(FRAME_KEYS, kind='stable').index.to_numpy()
+
+
+def _prev_in_play(x, col, keys=PLAY_KEYS):
+    """col of the previous row of the same play (or keys) in play order (NaN for the first row), aligned with x."""
+    ordered = x.loc[_play_order(x)]
+    return ordered.groupby(keys)[col].shift(1).reindex(x.index)
+
+
+@REGISTRY.register(inputs=['x_tackler', 'y_tackler', 'x_ballCarrier', 'y_ballCarrier', 'absoluteYardlineNumber'],
+                   outputs=['dist_ballCarrier_tackler', 'tacklerDepth', 'ballCarrierDepth', 'dist_ballCarrier_tackler_x'])
+def distances(x):
+    return pd.DataFrame({
+        'dist_ballCarrier_tackler': np.sqrt((x['x_tackler'] - x['x_ballCarrier'])**2 + (x['y_tackler'] - x['y_ballCarrier'])**2),
+        'tacklerDepth': x['x_tackler'] - x['absoluteYardlineNumber'],
+        'ballCarrierDepth': x['x_ballCarrier'] - x['absoluteYardlineNumber'],
+        'dist_ballCarrier_tackler_x': x['x_tackler'] - x['x_ballCarrier'],
+    })
+
+
+@REGISTRY.register(inputs=FRAME_KEYS + ['dist_ballCarrier_tackler', 'dist_ballCarrier_tackler_x'],
+                   outputs=['convergence_rate', 'convergence_rate_x', 's_tacklerTowardBallCarrier'],
+                   depends=[_play_order, _prev_in_play])
+def convergence(x):
+    prev_distance = _prev_in_play(x, 'dist_ballCarrier_tackler')
+    prev_distance_x = _prev_in_play(x, 'dist_ballCarrier_tackler_x')
+    return pd.DataFrame({
+        'convergence_rate': (prev_distance / x['dist_ballCarrier_tackler']).fillna(1),
+        'convergence_rate_x': (prev_distance_x / x['dist_ballCarrier_tackler_x']).fillna(1),
+        's_tacklerTowardBallCarrier': ((prev_distance - x['dist_ballCarrier_tackler']) / .1).fillna(0),
+    })
+
+
+@REGISTRY.register(inputs=['o_tackler', 'o_ballCarrier', 'dir_tackler', 'dir_ballCarrier'],
+                   outputs=['o_diff', 'dir_diff', 'dir_tackler_rad', 'dir_ballCarrier_rad',
+                            'sin_dir_tackler', 'sin_dir_ballCarrier', 'sin_o_sum', 'sin_dir_sum'])
+def angles(x):
+    dir_tackler_rad, dir_ballCarrier_rad = np.radians(x['dir_tackler']), np.radians(x['dir_ballCarrier'])
+    return pd.DataFrame({
+        'o_diff': x['o_tackler'] - x['o_ballCarrier'],
+        'dir_diff': x['dir_tackler'] - x['dir_ballCarrier'],
+        'dir_tackler_rad': dir_tackler_rad,
+        'dir_ballCarrier_rad': dir_ballCarrier_rad,
+        'sin_dir_tackler': np.sin(dir_tackler_rad),
+        'sin_dir_ballCarrier': np.sin(dir_ballCarrier_rad),
+        'sin_o_sum': np.sin(np.radians(x['o_tackler'])) + np.sin(np.radians(x['o_ballCarrier'])),
+        'sin_dir_sum': np.sin(dir_tackler_rad) + np.sin(dir_ballCarrier_rad),
+    })
+
+
+@REGISTRY.register(inputs=FRAME_KEYS + ['x_tackler', 'y_tackler', 'dir_tackler', 'x_ballCarrier', 'y_ballCarrier',
+                                        'dir_ballCarrier', 'absoluteYardlineNumber'],
+                   outputs=['expected_intersection_x', 'smoothed_expected_intersection_x'],
+                   depends=[_play_order, calculate_intersection_batch, smooth_by_play])
+def expected_intersection(x):
+    results = pd.DataFrame({'expected_intersection_x': calculate_intersection_batch(
+        x['x_tackler'], x['y_tackler'], x['dir_tackler'],
+        x['x_ballCarrier'], x['y_ballCarrier'], x['dir_ballCarrier'],
+        x['absoluteYardlineNumber'])}, index=x.index)
+
+    # Smoothed over the rows of a play in play order, like the notebook
+    ordered = pd.concat([x[['gameId', 'playId']], results], axis=1).loc[_play_order(x)]
+    results.loc[ordered.index, 'smoothed_expected_intersection_x'] = smooth_by_play(ordered, 'expected_intersection_x', sigma=2)
+    return results
+
+
+# Live counterparts of convergence and expected_intersection, the inputs of the streaming model
+# (streaming_inference.FEATURE_COLS): the previous frame of the same tackler instead of the previous row of
+# the play, and the expected intersection smoothed over the current and earlier frames of the tackler only
+@REGISTRY.register(inputs=FRAME_KEYS + ['tacklerId', 'dist_ballCarrier_tackler', 'dist_ballCarrier_tackler_x'],
+                   outputs=['convergence_rate_by_tackler', 'convergence_rate_x_by_tackler',
+                            's_tacklerTowardBallCarrier_by_tackler'],
+                   depends=[_play_order, _prev_in_play])
+def tackler_convergence(x):
+    prev_distance = _prev_in_play(x, 'dist_ballCarrier_tackler', TACKLER_KEYS)
+    prev_distance_x = _prev_in_play(x, 'dist_ballCarrier_tackler_x', TACKLER_KEYS)
+    first = prev_distance.isna()
+    return pd.DataFrame({
+        'convergence_rate_by_tackler': (prev_distance / x['dist_ballCarrier_tackler']).mask(first, 1),
+        'convergence_rate_x_by_tackler': (prev_distance_x / x['dist_ballCarrier_tackler_x']).mask(first, 1),
+        's_tacklerTowardBallCarrier_by_tackler': ((prev_distance - x['dist_ballCarrier_tackler']) / .1).mask(first, 0),
+    })
+
+
+@REGISTRY.register(inputs=FRAME_KEYS + ['tacklerId', 'expected_intersection_x'],
+                   outputs=['causal_smoothed_expected_intersection_x'],
+                   depends=[_play_order, causal_smooth_by_play])
+def causal_expected_intersection(x):
+    ordered = x.loc[_play_order(x), TACKLER_KEYS + ['expected_intersection_x']]
+    smoothed = causal_smooth_by_play(ordered, 'expected_intersection_x', sigma=2, keys=TACKLER_KEYS)
+    return pd.Series(smoothed, index=ordered.index).reindex(x.index)
+
+
+@REGISTRY.register(inputs=FRAME_KEYS + ['ballCarrierId', 'x_tackler', 'y_tackler', 'x_ballCarrier', 'y_ballCarrier'],
+                   outputs=['num_off_player_between'], tracking_columns=TRACKING_COLS,
+                   depends=[num_offensive_players_between_batch, _in_corridor, FrameArrays])
+def num_off_player_between(x, tracking_df):
+    return num_offensive_players_between_batch(x, tracking_df)
+
+
+@REGISTRY.register(inputs=FRAME_KEYS + ['tacklerId', 'ballCarrierId', 'x_tackler', 'y_tackler'],
+                   outputs=CLOSEST_PLAYER_COLS, tracking_columns=TRACKING_COLS,
+                   depends=[find_closest_players_and_ballcarrier_indicator_batch, k_smallest, FrameArrays])
+def closest_players(x, tracking_df):
+    return find_closest_players_and_ballcarrier_indicator_batch(x, tracking_df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute the registered features of x, reusing cached (feature, game) results.')
+    parser.add_argument('--x', default='./data/x.pkl', help='x with the tackler and ballCarrier tracking columns')
+    parser.add_argument('--features', nargs='+', default=None, choices=list(REGISTRY.features), help='default: all')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--max-cache-gb', type=float, default=MAX_CACHE_BYTES / 1024**3)
+    parser.add_argument('--out', default='./x_features.pkl')
+    args = parser.parse_args()
+
+    x = pd.read_pickle(args.x)
+    tracking = None
+    if any(REGISTRY.features[f].tracking_columns for f in args.features or REGISTRY.features):
+        tracking_path = feature_tracking_path(TRACKING_STORE, './data/tracking_new.pkl')
+        tracking = tracking_path if os.path.isdir(tracking_path) else read_tracking(tracking_path, TRACKING_COLS)
+
+    cache = FeatureCache(args.cache_dir, int(args.max_cache_gb * 1024**3))
+    x = build_features(x, REGISTRY, args.features, cache, tracking)
+    x.to_pickle(args.out)
+
+if __name__ == "__main__":
+    main()
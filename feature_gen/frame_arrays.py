@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+FRAME_KEYS = ['gameId', 'playId', 'frameId']
+
+
+class FrameArrays():
+    """
+    Tracking data grouped once by (gameId, playId, frameId) into dense (n_frames, max_players) arrays,
+    so that every row of x can look up all players of its frame with plain NumPy indexing.
+
+    Players keep the order they have in the tracking data within each frame, and empty slots are
+    padded with NaN (numeric columns) or -1 (club codes).
+    """
+
+    def __init__(self, tracking_df, columns=('nflId', 'x', 'y')):
+        df = tracking_df.sort_values(FRAME_KEYS, kind='stable')
+
+        # Frame number of each tracking row and the slot of the player within its frame
+        grouped = df.groupby(FRAME_KEYS, sort=False)
+        frame_codes = grouped.ngroup().to_numpy()
+        slots = grouped.cumcount().to_numpy()
+
+        self.index = pd.MultiIndex.from_frame(df.loc[:, FRAME_KEYS].drop_duplicates())
+        self.n_frames = len(self.index)
+        self.max_players = int(slots.max()) + 1 if len(slots) > 0 else 0
+
+        for col in columns:
+            arr = np.full((self.n_frames, self.max_players), np.nan)
+            arr[frame_codes, slots] = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            setattr(self, col, arr)
+
+        # Clubs are stored as integer codes, -1 marks an empty slot
+        club_codes, self.clubs = pd.factorize(df['club'])
+        self.club = np.full((self.n_frames, self.max_players), -1, dtype='int64')
+        self.club[frame_codes, slots] = club_codes
+
+    def get_indexer(self, df):
+        """Frame number for every row of df, -1 where the frame is not in the tracking data."""
+        return self.index.get_indexer(pd.MultiIndex.from_frame(df.loc[:, FRAME_KEYS]))
+
+    def player_slot(self, frame_idx, nflIds):
+        """Slot of each nflId within its frame, -1 where the player is not in the frame."""
+        is_player = self.nflId[frame_idx] == np.asarray(nflIds, dtype='float64')[:, None]
+        slots = is_player.argmax(axis=1)
+        slots[~is_player.any(axis=1)] = -1
+        return slots
+
+
+def k_smallest(dist, candidates, k):
+    """
+    The k smallest distances per row among the candidate slots, in ascending order, together with their
+    slots. Ties keep the tracking data order (like Series.nsmallest), missing values are NaN / -1.
+    """
+    candidates = candidates & ~np.isnan(dist)
+    keyed = np.where(candidates, dist, np.inf)
+
+    order = np.argsort(keyed, axis=1, kind='stable')[:, :k]
+    values = np.take_along_axis(keyed, order, axis=1)
+
+    missing = np.arange(order.shape[1]) >= candidates.sum(axis=1)[:, None]
+    values[missing] = np.nan
+    order[missing] = -1
+
+    # Pad when a frame holds fewer than k slots
+    if order.shape[1] < k:
+        pad = k - order.shape[1]
+        values = np.pad(values, ((0, 0), (0, pad)), constant_values=np.nan)
+        order = np.pad(order, ((0, 0), (0, pad)), constant_values=-1)
+
+    return values, order
@@ -1,6 +1,19 @@
 from tqdm import tqdm
 import numpy as np
 import pandas as pd
+import os
+
+from sharded_runner import run_sharded, parse_args, feature_tracking_path
+from profiling import enable_profiling, profiled, stage, PROFILER
+from frame_arrays import FrameArrays, FRAME_KEYS, k_smallest
+
+CLOSEST_PLAYER_COLS = ['closest_defender_1', 'closest_defender_2', 'closest_defender_3',
+                       'closest_offensive_1', 'closest_offensive_2', 'closest_offensive_3',
+                       'ballcarrier_closest_indicator']
+
+# Used instead of tracking_new.pkl if present and not compact, written with `python tracking_store.py --pickle ... --out ...`
+TRACKING_STORE = './data/tracking_new_store'
+TRACKING_COLS = FRAME_KEYS + ['nflId', 'club', 'x', 'y']
 
 # Enable tqdm for pandas apply
 tqdm.pandas()
@@ -36,19 +49,85 @@ def find_closest_players_and_ballcarrier_indicator(row, tracking_df):
     # Return the distances and the indicator
     return closest_defenders.tolist() + closest_offensive.tolist() + [ballcarrier_indicator]
 
+@profiled()
+def find_closest_players_and_ballcarrier_indicator_batch(x, tracking_df, frames=None, chunk_size=100000):
+    """
+    Batch version of find_closest_players_and_ballcarrier_indicator for every row of x at once.
+    Tracking data is grouped by frame a single time, rows are then processed in chunks with NumPy.
+    Returns a DataFrame with the CLOSEST_PLAYER_COLS columns, aligned with the index of x.
+    """
+    if frames is None:
+        frames = FrameArrays(tracking_df)
+
+    frame_idx = frames.get_indexer(x)
+    tackler_ids = x['tacklerId'].to_numpy(dtype='float64')
+    ballCarrier_ids = x['ballCarrierId'].to_numpy(dtype='float64')
+    x_tackler = x['x_tackler'].to_numpy(dtype='float64')
+    y_tackler = x['y_tackler'].to_numpy(dtype='float64')
+
+    distances = np.full((len(x), 6), np.nan)
+    indicator = np.zeros(len(x), dtype='int64')
+
+    for start in range(0, len(x), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(x)))
+        rows = rows[frame_idx[rows] >= 0]
+        fi = frame_idx[rows]
+
+        # Find the club of the tackler
+        tackler_slot = frames.player_slot(fi, tackler_ids[rows])
+        rows, fi, tackler_slot = rows[tackler_slot >= 0], fi[tackler_slot >= 0], tackler_slot[tackler_slot >= 0]
+        clubs = frames.club[fi]
+        tackler_club = clubs[np.arange(len(rows)), tackler_slot][:, None]
+
+        # Defenders exclude the tackler, the offense is everything else in the frame (including the football)
+        is_tackler = np.zeros(clubs.shape, dtype=bool)
+        is_tackler[np.arange(len(rows)), tackler_slot] = True
+        defenders = (clubs == tackler_club) & ~is_tackler
+        offensive = (clubs != tackler_club) & (clubs >= 0)
+
+        dist = np.sqrt((frames.x[fi] - x_tackler[rows, None])**2 + (frames.y[fi] - y_tackler[rows, None])**2)
+
+        closest_defenders, _ = k_smallest(dist, defenders, 3)
+        closest_offensive, offensive_slots = k_smallest(dist, offensive, 3)
+        distances[rows, :3] = closest_defenders
+        distances[rows, 3:] = closest_offensive
+
+        # Check if ballCarrier is among the three closest offensive players
+        closest_offensive_ids = np.where(offensive_slots >= 0,
+                                         np.take_along_axis(frames.nflId[fi], np.maximum(offensive_slots, 0), axis=1),
+                                         np.nan)
+        indicator[rows] = (closest_offensive_ids == ballCarrier_ids[rows, None]).any(axis=1)
+
+    results = pd.DataFrame(distances, index=x.index, columns=CLOSEST_PLAYER_COLS[:-1])
+    results[CLOSEST_PLAYER_COLS[-1]] = indicator
+    return results
+
 def main():
+    args = parse_args('Closest defenders and offensive players of the tackler for every row of x.')
+
+    if args.profile:
+        enable_profiling(cprofile=args.cprofile)
+
     # Load data
-    x = pd.read_pickle('./data/x.pkl')
-    df_tracking_new = pd.read_pickle('./data/tracking_new.pkl')
+    with stage('load x') as s:
+        x = pd.read_pickle('./data/x.pkl')
+        s.rows_out = len(x)
+    tracking_path = feature_tracking_path(TRACKING_STORE, './data/tracking_new.pkl')
 
-    # Apply the function and add new columns
-    results = x.progress_apply(lambda row: find_closest_players_and_ballcarrier_indicator(row, df_tracking_new), axis=1)
-    x[['closest_defender_1', 'closest_defender_2', 'closest_defender_3', 
-       'closest_offensive_1', 'closest_offensive_2', 'closest_offensive_3', 
-       'ballcarrier_closest_indicator']] = pd.DataFrame(results.tolist(), index=x.index)
+    # Compute the new columns shard by shard on all cores, reusing shards finished by a previous run
+    with stage('closest_players', rows_in=len(x)) as s:
+        results = run_sharded(x, tracking_path, find_closest_players_and_ballcarrier_indicator_batch, 'closest_players', args.checkpoint_dir,
+                              tracking_columns=TRACKING_COLS, workers=args.workers, games_per_shard=args.games_per_shard)
+        x[CLOSEST_PLAYER_COLS] = results
+        s.rows_out = len(results)
 
     # Save the updated dataframe
-    x.to_pickle('./x_updated.pkl')
+    with stage('save'):
+        x.to_pickle('./x_updated.pkl')
+
+    if args.profile:
+        PROFILER.summary()
+        PROFILER.save(args.profile)
 
 if __name__ == "__main__":
     main()
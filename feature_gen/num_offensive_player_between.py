@@ -1,6 +1,18 @@
 from tqdm import tqdm
 import numpy as np
 import pandas as pd
+import os
+from functools import partial
+
+from sharded_runner import run_sharded, parse_args, feature_tracking_path
+from profiling import enable_profiling, profiled, stage, PROFILER
+from frame_arrays import FrameArrays, FRAME_KEYS
+
+CORRIDORS = ['box', 'rectangle', 'cone']
+
+# Used instead of tracking_new.pkl if present and not compact, written with `python tracking_store.py --pickle ... --out ...`
+TRACKING_STORE = './data/tracking_new_store'
+TRACKING_COLS = FRAME_KEYS + ['nflId', 'club', 'x', 'y']
 
 # Enable tqdm for pandas apply
 tqdm.pandas()
@@ -28,18 +40,117 @@ def num_offensive_players_between_tackler_and_ballCarrier(row, tracking_df):
 
     return num_players
 
+def _in_corridor(px, py, x_tackler, y_tackler, x_ballCarrier, y_ballCarrier, corridor, half_width):
+    """
+    Mask of the player coordinates (n_rows, n_slots) inside the corridor between tackler and ballCarrier.
+      box:       axis aligned bounding box of the two players, widened by half_width yards in y (original feature)
+      rectangle: rectangle along the tackler->ballCarrier line, half_width yards to each side of the line
+      cone:      cone with its apex at the tackler, half_width yards to each side of the line at the ballCarrier
+    """
+    x_tackler, y_tackler = x_tackler[:, None], y_tackler[:, None]
+    x_ballCarrier, y_ballCarrier = x_ballCarrier[:, None], y_ballCarrier[:, None]
+
+    if corridor == 'box':
+        xmin, xmax = np.minimum(x_tackler, x_ballCarrier), np.maximum(x_tackler, x_ballCarrier)
+        ymin = np.minimum(y_tackler, y_ballCarrier) - half_width
+        ymax = np.maximum(y_tackler, y_ballCarrier) + half_width
+        return (px >= xmin) & (px <= xmax) & (py <= ymax) & (py >= ymin)
+
+    # Project players onto the unit vector pointing from the tackler to the ballCarrier
+    dx, dy = x_ballCarrier - x_tackler, y_ballCarrier - y_tackler
+    length = np.sqrt(dx**2 + dy**2)
+    safe_length = np.where(length > 0, length, 1)
+    ux, uy = dx / safe_length, dy / safe_length
+
+    rel_x, rel_y = px - x_tackler, py - y_tackler
+    along = rel_x * ux + rel_y * uy
+    across = np.sqrt(np.maximum(rel_x**2 + rel_y**2 - along**2, 0))
+
+    if corridor == 'rectangle':
+        max_across = half_width
+    elif corridor == 'cone':
+        max_across = half_width * along / safe_length
+    else:
+        raise ValueError(f"Unknown corridor '{corridor}', expected one of {CORRIDORS}")
+
+    return (along >= 0) & (along <= length) & (across <= max_across)
+
+@profiled()
+def num_offensive_players_between_batch(x, tracking_df, corridor='box', half_width=2, frames=None, chunk_size=100000):
+    """
+    Batch version of num_offensive_players_between_tackler_and_ballCarrier for every row of x at once,
+    with a configurable corridor shape (see _in_corridor). Returns an int Series aligned with the index of x.
+    """
+    if corridor not in CORRIDORS:
+        raise ValueError(f"Unknown corridor '{corridor}', expected one of {CORRIDORS}")
+    if frames is None:
+        frames = FrameArrays(tracking_df)
+
+    frame_idx = frames.get_indexer(x)
+    ballCarrier_ids = x['ballCarrierId'].to_numpy(dtype='float64')
+    coords = [x[col].to_numpy(dtype='float64') for col in ['x_tackler', 'y_tackler', 'x_ballCarrier', 'y_ballCarrier']]
+
+    num_players = np.zeros(len(x), dtype='int64')
+
+    for start in range(0, len(x), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(x)))
+        rows = rows[frame_idx[rows] >= 0]
+        fi = frame_idx[rows]
+
+        ballCarrier_slot = frames.player_slot(fi, ballCarrier_ids[rows])
+        found = ballCarrier_slot >= 0
+        rows, fi, ballCarrier_slot = rows[found], fi[found], ballCarrier_slot[found]
+
+        # Offensive players, excluding the ballCarrier
+        clubs = frames.club[fi]
+        ballCarrier_club = clubs[np.arange(len(rows)), ballCarrier_slot][:, None]
+        offensive = clubs == ballCarrier_club
+        offensive[np.arange(len(rows)), ballCarrier_slot] = False
+
+        inside = _in_corridor(frames.x[fi], frames.y[fi], *[c[rows] for c in coords], corridor, half_width)
+        num_players[rows] = (offensive & inside).sum(axis=1)
+
+    return pd.Series(num_players, index=x.index, name='num_off_player_between')
+
+def feature_name(corridor='box', half_width=2):
+    """Output column of a corridor, the original name for the original box of 2 yards."""
+    if corridor == 'box' and half_width == 2:
+        return 'num_off_player_between'
+    return f'num_off_player_between_{corridor}_{half_width:g}'
+
+def _add_corridor_arguments(parser):
+    parser.add_argument('--corridor', default='box', choices=CORRIDORS)
+    parser.add_argument('--half-width', type=float, default=2, help='yards to each side of the corridor')
+
 def main():
+    args = parse_args('Number of offensive players between tackler and ballCarrier for every row of x.',
+                      add_arguments=_add_corridor_arguments)
+    name = feature_name(args.corridor, args.half_width)
+    compute = partial(num_offensive_players_between_batch, corridor=args.corridor, half_width=args.half_width)
+
+    if args.profile:
+        enable_profiling(cprofile=args.cprofile)
+
     # Load data
-    x = pd.read_pickle('./data/x.pkl')
-    df_tracking_new = pd.read_pickle('./data/tracking_new.pkl')
+    with stage('load x') as s:
+        x = pd.read_pickle('./data/x.pkl')
+        s.rows_out = len(x)
+    tracking_path = feature_tracking_path(TRACKING_STORE, './data/tracking_new.pkl')
+
+    # Compute the new columns shard by shard on all cores, reusing shards finished by a previous run
+    with stage(name, rows_in=len(x)) as s:
+        results = run_sharded(x, tracking_path, compute, name, args.checkpoint_dir,
+                              tracking_columns=TRACKING_COLS, workers=args.workers, games_per_shard=args.games_per_shard)
+        x[name] = results['num_off_player_between']
+        s.rows_out = len(results)
 
-    # Apply the function and add new columns
-    results = x.progress_apply(lambda row: num_offensive_players_between_tackler_and_ballCarrier(
-        row, df_tracking_new), axis=1)
-    x['num_off_player_between'] = results.tolist()
+    # Save the updated dataframe, other corridors are written next to the original file
+    with stage('save'):
+        x.to_pickle('./x_updated_num_o_players.pkl' if name == 'num_off_player_between' else f'./x_updated_{name}.pkl')
 
-    # Save the updated dataframe
-    x.to_pickle('./x_updated_num_o_players.pkl')
+    if args.profile:
+        PROFILER.summary()
+        PROFILER.save(args.profile)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tracking_store import TrackingStore, write_tracking_store, numpy_dtypes
+
+
+def shard_games(x, games_per_shard):
+    """Split the sorted gameIds of x into shards of games_per_shard games."""
+    gameIds = np.sort(x['gameId'].unique())
+    return [gameIds[i:i+games_per_shard] for i in range(0, len(gameIds), games_per_shard)]
+
+
+def shard_path(checkpoint_dir, name, x_shard):
+    """Checkpoint file of a shard, named after a hash of its rows so that a changed x is never reused."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(x_shard).to_numpy().tobytes()).hexdigest()[:16]
+    return os.path.join(checkpoint_dir, f'{name}_{x_shard.gameId.min()}_{digest}.pkl')
+
+
+def tracking_store_path(tracking_path, checkpoint_dir):
+    """
+    Store the shards read their tracking slice from. A tracking pickle is converted once into a store in the
+    checkpoint directory, keeping its dtypes so that the results are identical to running on the pickle.
+    Nullable columns (e.g. an Int32 nflId) are converted to float64 with NaN first.
+    """
+    if os.path.isdir(tracking_path):
+        if TrackingStore(tracking_path).compact:
+            raise ValueError(f'{tracking_path} is a compact float32 store, features need a store written with compact=False')
+        return tracking_path
+
+    store_path = os.path.join(checkpoint_dir, f'tracking_store_{int(os.path.getmtime(tracking_path))}')
+    if not os.path.exists(os.path.join(store_path, 'meta.json')):
+        write_tracking_store(numpy_dtypes(pd.read_pickle(tracking_path)), store_path, compact=False)
+    return store_path
+
+
+def feature_tracking_path(store_path, pickle_path):
+    """
+    store_path if it holds a store written with compact=False, else pickle_path: the float32 columns of a
+    compact store would change the features.
+    """
+    if os.path.isdir(store_path):
+        if not TrackingStore(store_path).compact:
+            return store_path
+        print(f'{store_path} is a compact store, reading {pickle_path} instead')
+    return pickle_path
+
+
+def _run_shard(compute, x_shard, store_path, tracking_columns, out_path):
+    """Worker: load only the tracking rows of the shard's games, compute and write the shard output."""
+    gameIds = x_shard['gameId'].unique()
+    tracking_df = TrackingStore(store_path).load_games(gameIds, columns=tracking_columns)
+
+    results = compute(x_shard, tracking_df)
+    if isinstance(results, pd.Series):
+        results = results.to_frame()
+
+    # Write to a temporary file first, an existing shard file is always complete
+    tmp_path = out_path + '.tmp'
+    results.to_pickle(tmp_path)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def run_sharded(x, tracking_path, compute, name, checkpoint_dir, tracking_columns=None, workers=None,
+                games_per_shard=16):
+    """
+    Run compute(x_shard, tracking_shard) -> DataFrame/Series of new columns over x sharded by gameId on a
+    process pool. Every shard is written to checkpoint_dir as soon as it is done and shards already in
+    checkpoint_dir are reused, so a crashed run continues where it stopped. Returns the new columns for all
+    rows, aligned with (and in the order of) the index of x.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    store_path = tracking_store_path(tracking_path, checkpoint_dir)
+
+    x_shards = [x[x['gameId'].isin(gameIds)] for gameIds in shard_games(x, games_per_shard)]
+    paths = [shard_path(checkpoint_dir, name, x_shard) for x_shard in x_shards]
+    todo = [(x_shard, path) for x_shard, path in zip(x_shards, paths) if not os.path.exists(path)]
+    print(f'{len(x_shards) - len(todo)} of {len(x_shards)} shards already complete')
+
+    if len(todo) > 0:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_shard, compute, x_shard, store_path, tracking_columns, path)
+                       for x_shard, path in todo]
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                future.result()
+
+    results = pd.concat([pd.read_pickle(path) for path in paths])
+    return results.loc[x.index]
+
+
+def parse_args(description, add_arguments=None):
+    """Command line options shared by the feature_gen scripts, add_arguments(parser) adds script specific ones."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--games-per-shard', type=int, default=16)
+    parser.add_argument('--checkpoint-dir', default='./checkpoints', help='per-shard outputs, reused on restart')
+    parser.add_argument('--profile', default=None, help='write a json report of the stage timings to this path')
+    parser.add_argument('--cprofile', action='store_true', help='include cProfile output of the slowest stage')
+    if add_arguments is not None:
+        add_arguments(parser)
+    return parser.parse_args()
@@ -0,0 +1,114 @@
+import matplotlib.pyplot as plt
+import matplotlib.patches as patches
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+import numpy as np
+
+
+FIGSIZE = (12, 6.33)
+XLIM = (0, 120)
+YLIM = (-5, 58.3)
+
+# Colors of the field styles used by plotter.py ('plain') and plotter2.py ('grey')
+FIELD_STYLES = {
+    'plain': {'line': 'black', 'end_zone': 'lightblue', 'text': 'black', 'text_zorder': None},
+    'grey': {'line': 'lightgrey', 'end_zone': 'snow', 'text': 'lightgrey', 'text_zorder': 0},
+}
+
+# Rendered field backgrounds by (style, dpi)
+_FIELD_CACHE = {}
+
+
+def draw_football_field(ax, style='plain'):
+    """
+    Draw the field lines, end zones, yard numbers and ground markings onto ax.
+    Code from: https://www.kaggle.com/code/robikscube/nfl-big-data-bowl-plotting-player-position
+    """
+    colors = FIELD_STYLES[style]
+    text_kwargs = {} if colors['text_zorder'] is None else {'zorder': colors['text_zorder']}
+
+    # creat a rectangle representing the field with white color
+    ax.add_patch(patches.Rectangle((0, 0), 120, 53.3, facecolor='white', zorder=0))
+
+    # plot a line plot for marking the field lines
+    ax.plot([10, 10, 20, 20, 30, 30, 40, 40, 50, 50, 60, 60, 70, 70, 80,
+             80, 90, 90, 100, 100, 110, 110, 120, 0, 0, 120, 120],
+            [0, 53.3, 53.3, 0, 0, 53.3, 53.3, 0, 0, 53.3, 53.3, 0, 0, 53.3, 53.3,
+             0, 0, 53.3, 53.3, 0, 0, 53.3, 53.3, 53.3, 0, 0, 53.3],
+            color=colors['line'], zorder = 0)
+
+    # create the end-zones
+    ax.add_patch(patches.Rectangle((0, 0), 10, 53.3, facecolor=colors['end_zone'], alpha=0.2, zorder=0))
+    ax.add_patch(patches.Rectangle((110, 0), 120, 53.3, facecolor=colors['end_zone'], alpha=0.2, zorder=0))
+
+    # set the limits of x-axis and y-axis and remove the axis values from the plot
+    ax.set_xlim(*XLIM)
+    ax.set_ylim(*YLIM)
+    ax.axis('off')
+
+    # plot the numbers (yard lines)
+    for x in range(20, 110, 10):
+        number = x
+        if x > 50:
+            number = 120 - x
+
+        ax.text(x, 5, str(number - 10),
+                horizontalalignment='center',
+                fontsize=20,
+                color=colors['text'],
+                **text_kwargs)
+
+        ax.text(x - 0.6, 53.3 - 5, str(number - 10),
+                horizontalalignment='center',
+                fontsize=20,
+                color=colors['text'],
+                rotation=180,
+                **text_kwargs)
+
+    # make ground markings, all ~400 hash marks as a single collection
+    segments = [[(x, y0), (x, y1)] for x in range(11, 110)
+                for y0, y1 in [(0.4, 0.7), (53.0, 52.5), (22.91, 23.57), (29.73, 30.39)]]
+    ax.add_collection(LineCollection(segments, colors=colors['line'], zorder=0))
+
+
+def _render_field_image(style, dpi):
+    """Render the field once off-screen and crop the RGBA pixels of the axes area."""
+    fig = Figure(figsize=FIGSIZE, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    draw_football_field(ax, style)
+    fig.canvas.draw()
+
+    img = np.asarray(fig.canvas.buffer_rgba())
+    bbox = ax.get_window_extent()
+    height = img.shape[0]
+    x0, x1 = int(round(bbox.x0)), int(round(bbox.x1))
+    y0, y1 = int(round(height - bbox.y1)), int(round(height - bbox.y0))
+    return img[y0:y1, x0:x1].copy()
+
+
+def field_image(style='plain', dpi=100):
+    """RGBA pixels of the field (XLIM x YLIM), rendered once per style and dpi."""
+    key = (style, dpi)
+    if key not in _FIELD_CACHE:
+        _FIELD_CACHE[key] = _render_field_image(style, dpi)
+    return _FIELD_CACHE[key]
+
+
+def create_football_field(style='plain', cached=True):
+    """
+    Create the figure and axes of a football field. With cached=True the field is rendered only once per
+    style and dpi and later figures show that image as their background instead of rebuilding the artists.
+    """
+    fig, ax = plt.subplots(1, figsize=FIGSIZE)
+
+    if not cached:
+        draw_football_field(ax, style)
+        return fig, ax
+
+    ax.imshow(field_image(style, fig.dpi), extent=(*XLIM, *YLIM), aspect='auto', interpolation='nearest', zorder=0)
+    ax.set_xlim(*XLIM)
+    ax.set_ylim(*YLIM)
+    ax.axis('off')
+    return fig, ax
@@ -0,0 +1,111 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+
+SCORE_KEYS = ['gameId', 'playId', 'tacklerId']
+LEADERBOARD_PATH = 'data/leaderboard.pkl'
+
+
+def map_to_weights(percentile, r2_weights):
+    """
+    Vectorized map_to_weight of model.ipynb: the r-squared weight of the percentile bucket of every frame,
+    with a percentile of 1.0 falling into the last bucket.
+    """
+    weights = np.array([r2_weights[key] for key in sorted(r2_weights)])
+    buckets = (np.asarray(percentile, dtype='float64') * len(weights)).astype('int64')
+    return weights[np.minimum(buckets, len(weights) - 1)]
+
+
+def score_plays(df_pred, r2_weights):
+    """
+    Weighted prediction and Yards Saved Over Expected of every (gameId, playId, tacklerId) of df_pred
+    (predictions.pkl columns): pred_playResult weighted by the r-squared of each frame's percentile of the play.
+    """
+    grouped = df_pred.groupby(SCORE_KEYS, sort=False)
+    percentile = grouped['frameId'].rank(pct=True)
+    weight = map_to_weights(percentile, r2_weights)
+
+    sums = pd.DataFrame({'weighted': df_pred['pred_playResult'].to_numpy() * weight, 'weight': weight},
+                        index=df_pred.index).groupby([df_pred[key] for key in SCORE_KEYS], sort=False).sum()
+    scores = grouped['playResult'].first().to_frame()
+    scores['weighted_pred_playResult'] = sums['weighted'] / sums['weight']
+    scores['YSOE'] = scores['weighted_pred_playResult'] - scores['playResult']
+    return scores.reset_index()
+
+
+class Leaderboard():
+    """
+    YSOE per scored play and per player aggregates (sum of YSOE, number of tackles), updated incrementally:
+    update() only scores the plays it is given and adds them to the aggregates. Plays that were scored
+    before are replaced, so a re-run week is not counted twice.
+    """
+    def __init__(self, r2_weights):
+        self.r2_weights = dict(r2_weights)
+        self.play_scores = pd.DataFrame({col: pd.Series(dtype='int64') for col in SCORE_KEYS} |
+                                        {col: pd.Series(dtype='float64') for col in ['playResult', 'weighted_pred_playResult', 'YSOE']})
+        self.players = pd.DataFrame({'YSOE_sum': pd.Series(dtype='float64'), 'tackle_count': pd.Series(dtype='int64')},
+                                    index=pd.Index([], name='tacklerId'))
+
+    def _add_to_players(self, scores, sign):
+        per_player = scores.groupby('tacklerId')['YSOE'].agg(['sum', 'count'])
+        per_player.columns = ['YSOE_sum', 'tackle_count']
+        players = self.players.add(sign * per_player, fill_value=0)
+        self.players = players[players['tackle_count'] > 0].astype({'tackle_count': 'int64'})
+
+    def update(self, df_pred):
+        """Score the plays of df_pred (e.g. a new week of predictions), merge them in and return their scores."""
+        scores = score_plays(df_pred, self.r2_weights)
+
+        keys = pd.MultiIndex.from_frame(scores[SCORE_KEYS])
+        replaced = pd.MultiIndex.from_frame(self.play_scores[SCORE_KEYS]).isin(keys)
+        if replaced.any():
+            self._add_to_players(self.play_scores[replaced], -1)
+
+        self.play_scores = pd.concat([self.play_scores[~replaced], scores], ignore_index=True)
+        self._add_to_players(scores, 1)
+        return scores
+
+    def rankings(self, df_players=None, min_tackles=10):
+        """Players with at least min_tackles scored tackles by Avg_YSOE, with displayName/position of df_players."""
+        rankings = self.players.query('tackle_count >= @min_tackles').reset_index()
+        rankings['Avg_YSOE'] = (rankings['YSOE_sum'] / rankings['tackle_count']).round(3)
+        rankings = rankings[['tacklerId', 'Avg_YSOE', 'tackle_count']]
+        if df_players is not None:
+            players = df_players[['nflId', 'displayName', 'position']].rename({'nflId': 'tacklerId'}, axis=1)
+            rankings = players.merge(rankings, on='tacklerId', how='right')
+        return rankings.sort_values('Avg_YSOE', ascending=False, ignore_index=True)
+
+    def save(self, path=LEADERBOARD_PATH):
+        tmp_path = path + '.tmp'
+        pd.to_pickle({'r2_weights': self.r2_weights, 'play_scores': self.play_scores, 'players': self.players}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=LEADERBOARD_PATH):
+        state = pd.read_pickle(path)
+        leaderboard = cls(state['r2_weights'])
+        leaderboard.play_scores = state['play_scores']
+        leaderboard.players = state['players']
+        return leaderboard
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge a new week of predictions into the stored YSOE leaderboard.')
+    parser.add_argument('predictions', help='pickle with the predictions.pkl columns of the new plays')
+    parser.add_argument('--leaderboard', default=LEADERBOARD_PATH)
+    parser.add_argument('--players', default='data/players.csv')
+    parser.add_argument('--min-tackles', type=int, default=10)
+    args = parser.parse_args()
+
+    leaderboard = Leaderboard.load(args.leaderboard)
+    scores = leaderboard.update(pd.read_pickle(args.predictions))
+    leaderboard.save(args.leaderboard)
+    print(f'Scored {len(scores):,} tackles, {len(leaderboard.play_scores):,} in total')
+
+    print(leaderboard.rankings(pd.read_csv(args.players), args.min_tackles).head(15).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import numpy as np
+
+
+def frame_positions(df, mask, n_frames):
+    """
+    x and y of the tracking rows selected by mask as two (n_frames, max_players) arrays indexed by frameId,
+    padded with NaN (NaN points are not drawn by matplotlib). Frames without rows are all NaN.
+    """
+    sel = df[np.asarray(mask)]
+    frame_ids = sel['frameId'].to_numpy(dtype='int64')
+    keep = (frame_ids >= 0) & (frame_ids < n_frames)
+    frame_ids = frame_ids[keep]
+
+    # Slot of every row within its frame
+    order = np.argsort(frame_ids, kind='stable')
+    sorted_ids = frame_ids[order]
+    starts = np.searchsorted(sorted_ids, sorted_ids, side='left')
+    slots = np.empty(len(frame_ids), dtype='int64')
+    slots[order] = np.arange(len(frame_ids)) - starts
+
+    width = int(slots.max()) + 1 if len(slots) > 0 else 1
+    xs = np.full((n_frames, width), np.nan)
+    ys = np.full((n_frames, width), np.nan)
+    xs[frame_ids, slots] = sel['x'].to_numpy(dtype='float64')[keep]
+    ys[frame_ids, slots] = sel['y'].to_numpy(dtype='float64')[keep]
+    return xs, ys
+
+
+def frame_values(frame_ids, values, n_frames):
+    """Array of length n_frames with the first value of every frameId, NaN for frames without a value."""
+    frame_ids = np.asarray(frame_ids, dtype='int64')
+    values = np.asarray(values, dtype='float64')
+    keep = (frame_ids >= 0) & (frame_ids < n_frames)
+
+    out = np.full(n_frames, np.nan)
+    ids, first = np.unique(frame_ids[keep], return_index=True)
+    out[ids] = values[keep][first]
+    return out
@@ -0,0 +1,157 @@
+import os
+import pickle
+from collections import OrderedDict
+
+import pandas as pd
+
+from tracking_store import TrackingStore, week_store_path, STORE_DIR, WEEK_START, WEEK_END
+
+
+DATA_DIR = 'data'
+SIDECAR_PATH = 'data/play_index.pkl'
+PREDICTIONS_PATH = 'data/predictions.pkl'
+
+
+def _tracking_source(week, data_dir, store_dir):
+    """Tracking source of a week: the store index if the week was converted, else the csv file."""
+    store_path = week_store_path(week, store_dir)
+    if os.path.isdir(store_path):
+        return os.path.join(store_path, 'index.npy')
+    return os.path.join(data_dir, f'tracking_week_{week}.csv')
+
+
+def _source_mtimes(data_dir, store_dir, weeks):
+    paths = [_tracking_source(week, data_dir, store_dir) for week in weeks]
+    paths += [os.path.join(data_dir, 'plays.csv'), os.path.join(data_dir, 'games.csv')]
+    return {path: os.path.getmtime(path) for path in paths if os.path.exists(path)}
+
+
+def build_play_index(data_dir=DATA_DIR, store_dir=STORE_DIR, weeks=range(WEEK_START, WEEK_END+1)):
+    """
+    Index with the week of every gameId (taken from the tracking data), plus plays.csv and games.csv
+    indexed by (gameId, playId) and gameId. The mtimes of all sources are stored for invalidation.
+    """
+    index = {'mtimes': _source_mtimes(data_dir, store_dir, weeks), 'game_weeks': {}, 'plays': None, 'games': None}
+
+    for week in weeks:
+        source = _tracking_source(week, data_dir, store_dir)
+        if source.endswith('index.npy'):
+            gameIds = TrackingStore(os.path.dirname(source)).game_ids()
+        elif os.path.exists(source):
+            df_gids = pd.read_csv(source, usecols=[0])
+            if 'gameId' not in df_gids.columns:
+                raise Exception("First column of tracking data csv is expected to be 'gameId'")
+            gameIds = df_gids.gameId.unique()
+        else:
+            continue
+        for gid in gameIds:
+            index['game_weeks'][int(gid)] = week
+
+    plays_path = os.path.join(data_dir, 'plays.csv')
+    if os.path.exists(plays_path):
+        index['plays'] = pd.read_csv(plays_path).set_index(['gameId', 'playId'], drop=False).sort_index()
+
+    games_path = os.path.join(data_dir, 'games.csv')
+    if os.path.exists(games_path):
+        index['games'] = pd.read_csv(games_path).set_index('gameId', drop=False).sort_index()
+
+    return index
+
+
+def load_play_index(data_dir=DATA_DIR, store_dir=STORE_DIR, sidecar_path=SIDECAR_PATH,
+                    weeks=range(WEEK_START, WEEK_END+1)):
+    """Load the persisted play index, rebuilding it when any of its sources changed since it was written."""
+    if os.path.exists(sidecar_path):
+        with open(sidecar_path, 'rb') as f:
+            index = pickle.load(f)
+        if index['mtimes'] == _source_mtimes(data_dir, store_dir, weeks):
+            return index
+
+    index = build_play_index(data_dir, store_dir, weeks)
+    with open(sidecar_path, 'wb') as f:
+        pickle.dump(index, f)
+    return index
+
+
+class _LRUCache():
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, compute):
+        if key in self._data:
+            self._data.move_to_end(key)
+            return self._data[key]
+        value = compute()
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+
+class PlayMetadata():
+    """
+    Lazily loaded play / game / prediction lookups for the play animators. The play index is read from
+    the sidecar on first use, predictions.pkl on the first prediction lookup (and again if the file
+    changes), and the per-play results are kept in bounded LRU caches.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, store_dir=STORE_DIR, sidecar_path=SIDECAR_PATH,
+                 predictions_path=PREDICTIONS_PATH, maxsize=256):
+        self.data_dir = data_dir
+        self.store_dir = store_dir
+        self.sidecar_path = sidecar_path
+        self.predictions_path = predictions_path
+
+        self._index = None
+        self._df_pred = None
+        self._pred_mtime = None
+
+        self._play_cache = _LRUCache(maxsize)
+        self._game_cache = _LRUCache(maxsize)
+        self._pred_cache = _LRUCache(maxsize)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = load_play_index(self.data_dir, self.store_dir, self.sidecar_path)
+        return self._index
+
+    @property
+    def game_weeks(self):
+        return self.index['game_weeks']
+
+    def play_info(self, gameId, playId):
+        """All plays.csv columns of a play as a dict."""
+        def compute():
+            play_info_row = self.index['plays'].loc[[(gameId, playId)]]
+            return play_info_row.to_dict('records')[0]
+        return self._play_cache.get((gameId, playId), compute)
+
+    def game_info(self, gameId):
+        """All games.csv columns of a game as a dict."""
+        return self._game_cache.get(gameId, lambda: self.index['games'].loc[[gameId]].to_dict('records')[0])
+
+    @property
+    def df_pred(self):
+        """The full predictions table, reloaded when predictions.pkl changes."""
+        mtime = os.path.getmtime(self.predictions_path)
+        if self._df_pred is None or mtime != self._pred_mtime:
+            df_pred = pd.read_pickle(self.predictions_path)
+            self._df_pred = df_pred.set_index(['gameId', 'playId'], drop=False).sort_index()
+            self._df_pred.index.names = [None, None]
+            self._pred_mtime = mtime
+            self._pred_cache.clear()
+        return self._df_pred
+
+    def predictions(self, gameId, playId):
+        """Prediction rows of a play, empty if the play has no predictions."""
+        df_pred = self.df_pred
+        def compute():
+            if (gameId, playId) not in df_pred.index:
+                return df_pred.iloc[:0].reset_index(drop=True)
+            return df_pred.loc[[(gameId, playId)]].reset_index(drop=True)
+        return self._pred_cache.get((gameId, playId), compute)
@@ -1,124 +1,60 @@
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import matplotlib.animation as animation
 from matplotlib.animation import FuncAnimation
 from matplotlib import rc
 import pandas as pd
+import os
 from functools import partial
+from tracking_store import TrackingStore, week_store_path
+from play_index import PlayMetadata
+from field import create_football_field
+from profiling import profiled
+from play_frames import frame_positions
 
 WEEK_START = 1
 WEEK_END = 9
+TRACKING_STORE_DIR = 'data/tracking_store' # written by tracking_store.py, used instead of the csv files if present
 
 class NflPlayAnimator():
     def __init__(self):
         self.gameId_dict = {} # dict with gameId as key and week as value for caching
+        self.metadata = PlayMetadata(store_dir=TRACKING_STORE_DIR) # game weeks from the persisted play index
 
     def _populate_gameId_dict(self):
-        for week in range(WEEK_START, WEEK_END+1):
-            df_gids = pd.read_csv(f'data/tracking_week_{week}.csv', usecols=[0])
-            
-            if 'gameId' not in df_gids.columns:
-                raise Exception("First column of tracking data csv is expected to be 'gameId'")
-                
-            gameIds = df_gids.gameId.unique()
-            for gid in gameIds:
-                self.gameId_dict[gid] = week
-        
+        self.gameId_dict.update(self.metadata.game_weeks)
+    
     def load_play_data(self, gameId, playId):
         if len(self.gameId_dict) == 0:
             self._populate_gameId_dict()
 
-        df = pd.read_csv(f'data/tracking_week_{self.gameId_dict[gameId]}.csv')
+        week = self.gameId_dict[gameId]
+        store_path = week_store_path(week, TRACKING_STORE_DIR)
+        if os.path.isdir(store_path):
+            return TrackingStore(store_path).load_play(gameId, playId)
+
+        df = pd.read_csv(f'data/tracking_week_{week}.csv')
         df = df.query('gameId==@gameId & playId==@playId')
             
         return df
         
     
-    def _create_football_field(self):
+    def _create_football_field(self, cached=True):
         """
-        Code from: https://www.kaggle.com/code/robikscube/nfl-big-data-bowl-plotting-player-position
+        Field in the plain style, rendered once and reused as a cached background (see field.py).
         """
-        
-        # creat a rectangle representing the field with white color
-        rect = patches.Rectangle((0, 0), 120, 53.3, facecolor='white', zorder=0)
-    
-        # creat a subplot to plot our field on
-        fig, ax = plt.subplots(1, figsize=(12, 6.33))
-    
-        # add the rectangle to the plot
-        ax.add_patch(rect)
-    
-        # plot a line plot for marking the field lines with black color
-        plt.plot([10, 10, 20, 20, 30, 30, 40, 40, 50, 50, 60, 60, 70, 70, 80,
-                  80, 90, 90, 100, 100, 110, 110, 120, 0, 0, 120, 120],
-                 [0, 53.3, 53.3, 0, 0, 53.3, 53.3, 0, 0, 53.3, 53.3, 0, 0, 53.3, 53.3, 
-                  0, 0, 53.3, 53.3, 0, 0, 53.3, 53.3, 53.3, 0, 0, 53.3],
-                 color='black', zorder = 0)
-    
-        # create the end-zones with a lighter shade of blue
-        left_end_zone = patches.Rectangle((0, 0), 10, 53.3, facecolor='lightblue', alpha=0.2, zorder=0)
-        right_end_zone = patches.Rectangle((110, 0), 120, 53.3, facecolor='lightblue', alpha=0.2, zorder=0)
-    
-        # add the patches to the subplot
-        ax.add_patch(left_end_zone)
-        ax.add_patch(right_end_zone)
-    
-        # set the limits of x-axis and y-axis
-        plt.xlim(0, 120)
-        plt.ylim(-5, 58.3)
-    
-        # remove the axis values from the plot
-        plt.axis('off')
-    
-        # plot the numbers (yard lines) with black color
-        for x in range(20, 110, 10):
-            number = x
-            if x > 50:
-                number = 120 - x
-    
-            plt.text(x, 5, str(number - 10),
-                     horizontalalignment='center',
-                     fontsize=20,
-                     color='black')
-    
-            plt.text(x - 0.6, 53.3 - 5, str(number - 10),
-                     horizontalalignment='center',
-                     fontsize=20,
-                     color='black',
-                     rotation=180)
-    
-        # make ground markings with black color
-        for x in range(11, 110):
-            ax.plot([x, x], [0.4, 0.7], color='black', zorder = 0)
-            ax.plot([x, x], [53.0, 52.5], color='black', zorder = 0)
-            ax.plot([x, x], [22.91, 23.57], color='black', zorder = 0)
-            ax.plot([x, x], [29.73, 30.39], color='black', zorder = 0)
-        
-        return fig, ax
-
-    def _plot_players(self, df, dots_t1, dots_t2, ball, t1, t2, frame):
-        # Update dots for team 1
-        df_qry = df.query("frameId==@frame & club==@t1")
-        x_coords = df_qry.x.tolist()
-        y_coords = df_qry.y.tolist()
-        dots_t1.set_data(x_coords, y_coords)
+        return create_football_field('plain', cached=cached)
 
-        # Update dots for team 2
-        df_qry = df.query("frameId==@frame & club==@t2")
-        x_coords = df_qry.x.tolist()
-        y_coords = df_qry.y.tolist()
-        dots_t2.set_data(x_coords, y_coords)
-        
-        # Update dots for the football
-        df_qry = df.query("frameId==@frame & club=='football'")
-        x_coords = df_qry.x.tolist()
-        y_coords = df_qry.y.tolist()
-        ball.set_data(x_coords, y_coords)
+    def _plot_players(self, arrays, dots_t1, dots_t2, ball, frame):
+        # Update dots for team 1, team 2 and the football
+        for dots, key in [(dots_t1, 't1'), (dots_t2, 't2'), (ball, 'ball')]:
+            xs, ys = arrays[key]
+            dots.set_data(xs[frame], ys[frame])
         return dots_t1, dots_t2, ball
     
-    def animate_play(self, gameId, playId, interval=100):
+    @profiled('animate_play')
+    def animate_play(self, gameId, playId, interval=100, cached_field=True):
         plt.ioff()
-        fig, ax = self._create_football_field()
+        fig, ax = self._create_football_field(cached=cached_field)
 
         df = self.load_play_data(gameId, playId)
 
@@ -130,16 +66,23 @@ class NflPlayAnimator():
         dots_t2, = plt.plot([], [], 'ro')
         ball, = plt.plot([], [], c='brown', marker='D')
 
+        # Precompute the per-frame positions once, the animation callback only indexes into them
+        n_frames_max = max(n_frames, int(df.frameId.max()) + 1)
+        arrays = {
+            't1': frame_positions(df, df.club == t1, n_frames_max),
+            't2': frame_positions(df, df.club == t2, n_frames_max),
+            'ball': frame_positions(df, df.club == 'football', n_frames_max),
+        }
+
         rc('animation', html='html5')
         anim = FuncAnimation(
             fig, 
             func=partial(
                 self._plot_players, 
-                df, 
+                arrays,
                 dots_t1, 
                 dots_t2, 
-                ball,
-                t1, t2), 
+                ball), 
             frames=n_frames, 
             interval=interval, 
             blit=True)
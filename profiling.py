@@ -0,0 +1,187 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process over its whole lifetime so far in MB (ru_maxrss), None where the
+    resource module is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+def cpu_seconds():
+    """CPU time of this process and its finished child processes (e.g. a closed process pool)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def n_rows(obj):
+    """Number of rows of a DataFrame, Series or array, None for anything else."""
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(obj)
+    return None
+
+
+class StageRecord():
+    """Measurements of one stage. rows_out can be set inside the `with` block."""
+    def __init__(self, name, rows_in=None, depth=0):
+        self.name = name
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_s = None
+        self.cpu_s = None
+        self.process_peak_rss_mb = None # peak RSS of the process up to the end of the stage, not of the stage alone
+        self.peak_rss_increase_mb = None # how much the stage raised that process peak (0 if it stayed below it)
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class Profiler():
+    """
+    Records wall time, CPU time, process peak RSS and input/output row counts of named (possibly nested) stages.
+    With cprofile=True every top level stage runs under cProfile and the stats of the slowest one are kept.
+    """
+    def __init__(self, enabled=True, cprofile=False):
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.stages = []
+        self._depth = 0
+        self._slowest = None # (record, cProfile.Profile) of the slowest cProfiled stage
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        record = StageRecord(name, rows_in, self._depth)
+        if not self.enabled:
+            yield record
+            return
+
+        # cProfile can only profile one stage at a time, nested stages are covered by their top level stage
+        profile = cProfile.Profile() if self.cprofile and self._depth == 0 else None
+        self.stages.append(record)
+        self._depth += 1
+
+        peak_before = peak_rss_mb()
+        cpu_start = cpu_seconds()
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record.wall_s = time.perf_counter() - start
+            record.cpu_s = cpu_seconds() - cpu_start
+            record.process_peak_rss_mb = peak_rss_mb()
+            if peak_before is not None:
+                record.peak_rss_increase_mb = record.process_peak_rss_mb - peak_before
+            self._depth -= 1
+
+            if profile is not None and (self._slowest is None or record.wall_s > self._slowest[0].wall_s):
+                self._slowest = (record, profile)
+
+    def report(self):
+        """DataFrame with one row per stage, in the order the stages started."""
+        return pd.DataFrame([record.as_dict() for record in self.stages])
+
+    def summary(self):
+        """Print the stages indented by nesting depth."""
+        print(f"{'stage':<56} {'wall s':>9} {'cpu s':>9} {'proc peak MB':>12} {'peak +MB':>9} {'rows in':>12} {'rows out':>12}")
+        for r in self.stages:
+            if r.wall_s is None:
+                continue
+            rows_in = '' if r.rows_in is None else f'{r.rows_in:,}'
+            rows_out = '' if r.rows_out is None else f'{r.rows_out:,}'
+            peak = '' if r.process_peak_rss_mb is None else f'{r.process_peak_rss_mb:,.0f}'
+            increase = '' if r.peak_rss_increase_mb is None else f'{r.peak_rss_increase_mb:,.0f}'
+            print(f"{'  ' * r.depth + r.name:<56} {r.wall_s:9.2f} {r.cpu_s:9.2f} {peak:>12} "
+                  f"{increase:>9} {rows_in:>12} {rows_out:>12}")
+
+    def cprofile_stats(self, n=30, sort='cumulative'):
+        """cProfile output of the slowest profiled stage as text, None if nothing was profiled."""
+        if self._slowest is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(self._slowest[1], stream=stream).sort_stats(sort).print_stats(n)
+        return stream.getvalue()
+
+    def save(self, path):
+        """
+        Write the stages as json to path. If a stage was cProfiled, the slowest stage's stats are included
+        as text and dumped next to it as <path>.prof for snakeviz/pstats.
+        """
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'stages': [record.as_dict() for record in self.stages],
+            'slowest_stage': None if self._slowest is None else self._slowest[0].name,
+            'cprofile': self.cprofile_stats(),
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=1)
+        if self._slowest is not None:
+            self._slowest[1].dump_stats(os.path.splitext(path)[0] + '.prof')
+
+
+# Profiler used by `stage` and `profiled`, disabled until enable_profiling is called
+PROFILER = Profiler(enabled=False)
+
+
+def enable_profiling(cprofile=False):
+    """Start recording stages (clearing earlier ones) with the module profiler and return it."""
+    PROFILER.__init__(enabled=True, cprofile=cprofile)
+    return PROFILER
+
+
+def stage(name, rows_in=None):
+    """
+    Context manager recording a stage with the module profiler:
+        with stage('trim', rows_in=len(df_tracking)) as s:
+            ...
+            s.rows_out = len(df_tracking_new)
+    """
+    return PROFILER.stage(name, rows_in)
+
+
+def profiled(name=None):
+    """
+    Decorator recording every call as a stage. Input rows are those of the first DataFrame/Series/array
+    argument, output rows those of the return value.
+    """
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+
+            rows_in = next((n_rows(a) for a in [*args, *kwargs.values()] if n_rows(a) is not None), None)
+            with PROFILER.stage(stage_name, rows_in) as record:
+                result = func(*args, **kwargs)
+                record.rows_out = n_rows(result)
+            return result
+        return wrapper
+    return decorator
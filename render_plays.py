@@ -0,0 +1,150 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.animation import FFMpegWriter, PillowWriter
+import pandas as pd
+
+from plotter2 import NflPlayAnimator, TRACKING_STORE_DIR
+from tracking_store import week_store_path
+
+
+FORMATS = ['gif', 'mp4']
+BACKENDS = ['matplotlib', 'sprite'] # sprite: fast NumPy previews without play description and legend
+
+# Animator of the worker process, kept between tasks so a week is only loaded once per worker
+_animator = None
+
+
+def output_path(out_dir, gameId, playId, tacklerId, fmt):
+    return os.path.join(out_dir, f'{gameId}_{playId}_{tacklerId}.{fmt}')
+
+
+def _get_animator(week):
+    global _animator
+    if _animator is None:
+        _animator = NflPlayAnimator()
+
+    # Without a tracking store the week csv is loaded once, keeping only the current week in memory
+    if not os.path.isdir(week_store_path(week, TRACKING_STORE_DIR)) and week not in _animator.week_data:
+        _animator.week_data.clear()
+        _animator.preload_week(week)
+    return _animator
+
+
+def render_play(animator, gameId, playId, tacklerId, path, fmt='gif', interval=100, backend='matplotlib'):
+    """Render one play to path, writing to a temporary file first so a crash never leaves a partial output."""
+    tmp_path = f'{path}.tmp.{fmt}'
+    if backend == 'sprite':
+        try:
+            animator.save_play(gameId, playId, tacklerId, tmp_path, interval=interval)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return
+
+    fps = 1000 / interval
+    writer = PillowWriter(fps=fps) if fmt == 'gif' else FFMpegWriter(fps=fps)
+    figures_before = set(plt.get_fignums())
+    try:
+        anim = animator.animate_play(gameId, playId, tacklerId, interval=interval)
+        anim.save(tmp_path, writer=writer)
+        os.replace(tmp_path, path)
+    finally:
+        # Close every figure of this play, also when animate_play failed after creating one
+        for num in set(plt.get_fignums()) - figures_before:
+            plt.close(num)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _render_chunk(week, plays, out_dir, fmt, interval, backend):
+    """Render a chunk of plays of one week in a worker process, returning one result row per play."""
+    animator = _get_animator(week)
+    results = []
+    for gameId, playId, tacklerId in plays:
+        path = output_path(out_dir, gameId, playId, tacklerId, fmt)
+        start = time.perf_counter()
+        error = None
+        try:
+            render_play(animator, gameId, playId, tacklerId, path, fmt, interval, backend)
+        except Exception as e:
+            error = repr(e)
+        results.append({'gameId': gameId, 'playId': playId, 'tacklerId': tacklerId, 'week': week,
+                        'path': path, 'seconds': time.perf_counter() - start, 'error': error})
+    return results
+
+
+def render_plays(plays, out_dir, fmt='gif', workers=None, interval=100, chunk_size=8, backend='matplotlib'):
+    """
+    Render (gameId, playId, tacklerId) triples headless across a process pool. Plays are grouped by week
+    so each worker loads the tracking data of a week once, and plays with an existing output are skipped,
+    so an interrupted batch can simply be restarted. Returns a DataFrame with the render time of every play.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    todo = [(int(g), int(p), int(t)) for g, p, t in plays
+            if not os.path.exists(output_path(out_dir, int(g), int(p), int(t), fmt))]
+    print(f'{len(plays) - len(todo)} of {len(plays)} plays already rendered, {len(todo)} to go')
+    if len(todo) == 0:
+        return pd.DataFrame()
+
+    game_weeks = NflPlayAnimator().metadata.game_weeks
+    by_week = {}
+    results = []
+    for play in todo:
+        if play[0] not in game_weeks:
+            # Skipped like a failed render, the rest of the batch still runs
+            error = f'gameId {play[0]} not in games.csv'
+            print(f'{play[0]} {play[1]} {play[2]}: SKIPPED {error}')
+            results.append({'gameId': play[0], 'playId': play[1], 'tacklerId': play[2], 'week': None,
+                            'path': None, 'seconds': 0., 'error': error})
+            continue
+        by_week.setdefault(game_weeks[play[0]], []).append(play)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_render_chunk, week, week_plays[i:i+chunk_size], out_dir, fmt, interval, backend)
+                   for week, week_plays in sorted(by_week.items())
+                   for i in range(0, len(week_plays), chunk_size)]
+        for future in as_completed(futures):
+            for result in future.result():
+                status = 'FAILED ' + result['error'] if result['error'] else f"{result['seconds']:.2f}s"
+                print(f"{result['gameId']} {result['playId']} {result['tacklerId']}: {status}")
+                results.append(result)
+
+    df_results = pd.DataFrame(results)
+    rendered = df_results[df_results.error.isna()]
+    if len(rendered) > 0:
+        print(f'Rendered {len(rendered)} plays, mean {rendered.seconds.mean():.2f}s per play')
+    return df_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render play animations headless in parallel.')
+    parser.add_argument('plays', help='csv or pickle with gameId, playId and tacklerId columns')
+    parser.add_argument('--out', default='renders', help='output directory')
+    parser.add_argument('--format', default='gif', choices=FORMATS)
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--interval', type=int, default=100, help='milliseconds per frame')
+    parser.add_argument('--backend', default='matplotlib', choices=BACKENDS, help='sprite: fast previews drawn with NumPy')
+    args = parser.parse_args()
+
+    df_plays = pd.read_pickle(args.plays) if args.plays.endswith('.pkl') else pd.read_csv(args.plays)
+    plays = df_plays[['gameId', 'playId', 'tacklerId']].drop_duplicates().itertuples(index=False, name=None)
+
+    df_results = render_plays(list(plays), args.out, args.format, args.workers, args.interval, backend=args.backend)
+    if len(df_results) > 0:
+        log_path = os.path.join(args.out, 'render_times.csv')
+        df_results.to_csv(log_path, mode='a', header=not os.path.exists(log_path), index=False)
+
+if __name__ == "__main__":
+    main()
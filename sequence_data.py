@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+
+SEQUENCE_KEYS = ['gameId', 'playId', 'tacklerId']
+
+# Value y (and X) is padded with, masked out by masked_mean_squared_error in model.ipynb
+PADDING_VALUE = 10000
+
+
+class RaggedSequences():
+    """
+    Variable length (gameId, playId, tacklerId) sequences without padding: the frames of all sequences in
+    one flat (n_frames, n_features) array and offsets so that sequence i is features[offsets[i]:offsets[i+1]].
+    keys holds one row of key columns per sequence, e.g. to split by week.
+    """
+    def __init__(self, features, targets, offsets, keys):
+        self.features = features
+        self.targets = targets
+        self.offsets = offsets
+        self.keys = keys.reset_index(drop=True)
+
+    @classmethod
+    def from_frame(cls, data, feature_cols, target_col='playResult', key_cols=SEQUENCE_KEYS, sequence_cols=SEQUENCE_KEYS):
+        """
+        Sequences of data, in the order of groupby(sequence_cols) like prepare_data of model.ipynb.
+        Frames keep their order within each sequence, so data should be sorted by frameId. Without a
+        target_col (e.g. to predict) targets are NaN.
+        """
+        codes = data.groupby(sequence_cols, sort=True).ngroup().to_numpy()
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        offsets = np.r_[starts, len(order)].astype('int64')
+        features = data[feature_cols].to_numpy(dtype='float32')[order]
+        targets = data[target_col].to_numpy(dtype='float32')[order] if target_col else np.full(len(order), np.nan, dtype='float32')
+        keys = data[key_cols].iloc[order[starts]]
+        return cls(features, targets, offsets, keys)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def n_features(self):
+        return self.features.shape[1]
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.features[start:end], self.targets[start:end]
+
+    def subset(self, selection):
+        """Sequences selected by a boolean mask or integer indices, e.g. seqs.subset(seqs.keys.week <= 5)."""
+        idx = np.arange(len(self))[np.asarray(selection)]
+        frames = frame_index(self.offsets, idx)
+        offsets = np.r_[0, np.cumsum(self.lengths[idx])].astype('int64')
+        return RaggedSequences(self.features[frames], self.targets[frames], offsets, self.keys.iloc[idx])
+
+    def pad(self, idx=None, max_len=None, padding_value=PADDING_VALUE):
+        """
+        Post-padded X (n, max_len, n_features) and Y (n, max_len, 1) of the sequences idx (default all),
+        the same arrays as prepare_data of model.ipynb. max_len defaults to the longest selected sequence;
+        longer sequences keep their last max_len frames, like pad_sequences.
+        """
+        idx = np.arange(len(self)) if idx is None else np.asarray(idx)
+        full_lengths = self.lengths[idx]
+        max_len = int(full_lengths.max()) if max_len is None else max_len
+        lengths = np.minimum(full_lengths, max_len)
+
+        # Position of every copied frame in the padded batch and in the flat arrays
+        seq = np.repeat(np.arange(len(idx)), lengths)
+        step = np.arange(len(seq)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        frames = np.repeat(self.offsets[idx] + full_lengths - lengths, lengths) + step
+
+        X = np.full((len(idx), max_len, self.n_features), padding_value, dtype='float32')
+        Y = np.full((len(idx), max_len, 1), padding_value, dtype='float32')
+        X[seq, step] = self.features[frames]
+        Y[seq, step, 0] = self.targets[frames]
+        return X, Y
+
+    def save(self, path):
+        """Save as npz, the keys are stored column by column."""
+        np.savez(path, features=self.features, targets=self.targets, offsets=self.offsets,
+                 key_cols=np.array(self.keys.columns), **{f'key_{col}': self.keys[col].to_numpy() for col in self.keys})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as f:
+            keys = pd.DataFrame({col: f[f'key_{col}'] for col in f['key_cols']})
+            return cls(f['features'], f['targets'], f['offsets'], keys)
+
+
+def frame_index(offsets, idx):
+    """Indices into the flat arrays of all frames of the sequences idx, in order."""
+    lengths = offsets[idx + 1] - offsets[idx]
+    step = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(offsets[idx], lengths) + step
+
+
+def length_buckets(seqs, batch_size=32, n_buckets=10, shuffle=True, seed=None):
+    """
+    Sequence indices of every batch. Sequences are split into n_buckets length quantiles, and batches are
+    formed within a bucket so that they hold sequences of similar length. Batch order is shuffled.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = seqs.lengths
+    boundaries = np.quantile(lengths, np.linspace(0, 1, n_buckets + 1)[1:-1])
+    buckets = np.searchsorted(boundaries, lengths, side='right')
+
+    order = rng.permutation(len(seqs)) if shuffle else np.arange(len(seqs))
+    order = order[np.argsort(buckets[order], kind='stable')]
+    bucket_of = buckets[order]
+
+    batches = []
+    for bucket in np.unique(bucket_of):
+        members = order[bucket_of == bucket]
+        batches.extend(members[i:i+batch_size] for i in range(0, len(members), batch_size))
+
+    if shuffle:
+        batches = [batches[i] for i in rng.permutation(len(batches))]
+    return batches
+
+
+def n_batches(seqs, batch_size=32, n_buckets=10):
+    """Number of batches per epoch of bucket_batches, for steps_per_epoch."""
+    return len(length_buckets(seqs, batch_size, n_buckets, shuffle=False))
+
+
+def bucket_batches(seqs, batch_size=32, n_buckets=10, padding_value=PADDING_VALUE, shuffle=True, repeat=True, seed=None):
+    """
+    Generator of (X, Y) batches padded only to the longest sequence of the batch (see length_buckets).
+    Padding is the same as prepare_data, so masked_mean_squared_error is unchanged. With repeat=True
+    batches are reshuffled every epoch and the generator never ends (use steps_per_epoch=n_batches(...)).
+    """
+    rng = np.random.default_rng(seed)
+    while True:
+        for idx in length_buckets(seqs, batch_size, n_buckets, shuffle, rng):
+            yield seqs.pad(idx, padding_value=padding_value)
+        if not repeat:
+            return
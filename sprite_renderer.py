@@ -0,0 +1,187 @@
+import itertools
+import subprocess
+
+import numpy as np
+from matplotlib.colors import to_rgb
+from PIL import Image
+
+from field import field_image, XLIM, YLIM
+
+
+# Colors of plotter2.py: (face, edge) of every group of dots, drawn in this order (teams below the
+# highlighted tackler and ballCarrier, the football on top)
+DOT_COLORS = {
+    't1': ('#E88A8A', '#EE4F4F'),
+    't2': ('#898989', '#525252'),
+    'tackler': ('black', 'black'),
+    'ballCarrier': ('#ff0000', 'black'),
+    'ball': ('brown', 'black'),
+}
+MARKER_SIZES = {'ball': 4} # points, 6 for all other dots
+
+# Colors and alpha of the vertical lines of plotter2.py
+LINE_COLORS = {
+    'los': ('#3253e6', 0.8),
+    'first_down': ('#FDDA0D', 0.8),
+    'actual_tackle': ('purple', 1.0),
+    'pred_tackle': ('green', 1.0),
+}
+LINE_WIDTH = 1.5 # points
+FIELD_WIDTH = 53.3
+
+
+def _rgb(color):
+    return np.array([round(255 * c) for c in to_rgb(color)], dtype='uint8')
+
+
+def _sprite(diameter, edge_width, marker='o'):
+    """Pixel offsets (dy, dx) of the face and of the edge of a marker of diameter pixels."""
+    radius = max(diameter / 2, 1)
+    r = int(np.ceil(radius))
+    dy, dx = np.mgrid[-r:r+1, -r:r+1]
+    dist = np.abs(dx) + np.abs(dy) if marker == 'D' else np.sqrt(dx**2 + dy**2)
+    inside = dist <= radius
+    edge = inside & (dist > radius - edge_width)
+    face = inside & ~edge
+    return (dy[face], dx[face]), (dy[edge], dx[edge])
+
+
+def _forward_fill(values):
+    """Carry the last non-NaN row forward, like a matplotlib artist that is not updated in frames without data."""
+    values = np.asarray(values, dtype='float64')
+    valid = ~np.isnan(values.reshape(len(values), -1)).all(axis=1)
+    last = np.where(valid, np.arange(len(values)), -1)
+    last = np.maximum.accumulate(last)
+    filled = values[np.maximum(last, 0)]
+    filled[last < 0] = np.nan
+    return filled
+
+
+class SpriteRenderer():
+    """
+    Renders play frames as NumPy RGB arrays without matplotlib artists: the field is rendered once into an RGB
+    buffer, and every frame is a copy of the play background with the dots written as pixel sprites.
+    Much faster than FuncAnimation for bulk previews, with the colors of plotter2.py (no titles or legend).
+    """
+    def __init__(self, dpi=60, style='grey'):
+        field = field_image(style, dpi)[..., :3]
+        # Even width and height for the yuv420p mp4 encoding
+        self.field = np.ascontiguousarray(field[:field.shape[0] // 2 * 2, :field.shape[1] // 2 * 2])
+        self.height, self.width = self.field.shape[:2]
+        self.px_per_point = dpi / 72
+
+        edge_width = max(self.px_per_point, 1)
+        self.sprites = {key: _sprite(MARKER_SIZES.get(key, 6) * self.px_per_point, edge_width, 'D' if key == 'ball' else 'o')
+                        for key in DOT_COLORS}
+        self.dot_colors = {key: (_rgb(face), _rgb(edge)) for key, (face, edge) in DOT_COLORS.items()}
+        self.line_width = max(int(round(LINE_WIDTH * self.px_per_point)), 1)
+
+    def to_pixels(self, x, y):
+        """Column and row of field coordinates, rows counted from the top."""
+        col = (np.asarray(x) - XLIM[0]) / (XLIM[1] - XLIM[0]) * self.width
+        row = (YLIM[1] - np.asarray(y)) / (YLIM[1] - YLIM[0]) * self.height
+        return col.astype('int64'), row.astype('int64')
+
+    def _draw_line(self, img, x, color, alpha=1.0):
+        """Vertical line at yardline x from sideline to sideline, blended with alpha."""
+        col = self.to_pixels(x, 0)[0]
+        top, bottom = self.to_pixels(0, [FIELD_WIDTH, 0])[1]
+        cols = slice(max(col - self.line_width // 2, 0), max(col - self.line_width // 2 + self.line_width, 0))
+        rows = slice(max(top, 0), min(bottom, self.height))
+        if alpha < 1:
+            img[rows, cols] = (alpha * _rgb(color) + (1 - alpha) * img[rows, cols]).astype('uint8')
+        else:
+            img[rows, cols] = _rgb(color)
+
+    def _draw_dots(self, img, xs, ys, key):
+        """Write the sprite of every non-NaN (x, y) into img in one vectorized assignment per color."""
+        valid = ~np.isnan(xs)
+        cols, rows = self.to_pixels(xs[valid], ys[valid])
+        for offsets, color in zip(self.sprites[key], self.dot_colors[key]):
+            r = rows[:, None] + offsets[0]
+            c = cols[:, None] + offsets[1]
+            inside = (r >= 0) & (r < self.height) & (c >= 0) & (c < self.width)
+            img[r[inside], c[inside]] = color
+
+    def play_background(self, lines):
+        """Field with the static lines of a play, lines maps a LINE_COLORS key to its yardline."""
+        img = self.field.copy()
+        for key, x in lines.items():
+            if x is not None and not np.isnan(x):
+                self._draw_line(img, x, *LINE_COLORS[key])
+        return img
+
+    def frames(self, arrays, lines, n_frames):
+        """
+        Generator of (height, width, 3) uint8 frames from the per-frame positions of NflPlayAnimator._frame_arrays.
+        Tackler, ballCarrier and the predicted tackle line keep their last position while they are missing.
+        """
+        background = self.play_background(lines)
+        positions = {key: arrays[key] for key in ['t1', 't2', 'ball']}
+        for key in ['tackler', 'ballCarrier']:
+            xs, ys = arrays[key]
+            positions[key] = _forward_fill(xs[:, :1]), _forward_fill(ys[:, :1])
+        pred_tackle_line = _forward_fill(arrays['pred_tackle_line'])
+
+        for frame in range(n_frames):
+            img = background.copy()
+            if not np.isnan(pred_tackle_line[frame]):
+                self._draw_line(img, pred_tackle_line[frame], *LINE_COLORS['pred_tackle'])
+            for key in DOT_COLORS:
+                xs, ys = positions[key]
+                self._draw_dots(img, xs[frame], ys[frame], key)
+            yield img
+
+
+# Palette index of pixels that did not change since the previous gif frame
+GIF_TRANSPARENT = 255
+
+
+def _gif_palette(frame):
+    """Palette of the field and all sprite and line colors, shared by all frames of a gif."""
+    colors = [_rgb(c) for pair in DOT_COLORS.values() for c in pair] + [_rgb(c) for c, _ in LINE_COLORS.values()]
+    swatch = np.broadcast_to(np.array(colors, dtype='uint8')[None], (4, len(colors), 3))
+    swatch = np.pad(swatch, ((0, 0), (0, frame.shape[1] - len(colors)), (0, 0)), mode='edge')
+    return Image.fromarray(np.concatenate([frame, swatch])).quantize(colors=GIF_TRANSPARENT)
+
+
+def _gif_frames(frames, palette):
+    """
+    Palette images of the frames where pixels that did not change since the previous frame are transparent,
+    so only the moving sprites are compressed (what Pillow's optimize does, without its per-pixel loops).
+    """
+    previous = None
+    for img in frames:
+        indices = np.asarray(Image.fromarray(img).quantize(palette=palette, dither=Image.Dither.NONE))
+        delta = indices if previous is None else np.where(indices == previous, GIF_TRANSPARENT, indices).astype('uint8')
+        previous = indices
+        frame = Image.fromarray(delta, mode='P')
+        frame.putpalette(palette.getpalette())
+        yield frame
+
+
+def write_frames(frames, path, fps=10):
+    """
+    Encode an iterable of RGB frames to path while they are generated: gifs with Pillow on one shared palette,
+    mp4 by piping raw frames to ffmpeg.
+    """
+    frames = iter(frames)
+    first = next(frames)
+    if path.endswith('.gif'):
+        gif_frames = _gif_frames(itertools.chain([first], frames), _gif_palette(first))
+        next(gif_frames).save(path, format='GIF', save_all=True, append_images=gif_frames, optimize=False,
+                              transparency=GIF_TRANSPARENT, disposal=1, duration=int(round(1000 / fps)), loop=0)
+        return
+
+    height, width = first.shape[:2]
+    cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+           '-r', str(fps), '-i', '-', '-pix_fmt', 'yuv420p', '-f', 'mp4', path]
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        process.stdin.write(first.tobytes())
+        for img in frames:
+            process.stdin.write(img.tobytes())
+    finally:
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f'ffmpeg failed to encode {path}')
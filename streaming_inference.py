@@ -0,0 +1,327 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_gen'))
+from frame_arrays import k_smallest
+from num_offensive_player_between import _in_corridor
+from expected_intersection import calculate_intersection_batch, causal_gaussian_weights
+from tracking_loader import load_tracking
+
+
+# Inputs of the streaming model in the order of the columns its scaler and LSTM are fitted on in model.ipynb:
+# the offline model features with the live convergence and expected intersection of feature_gen/features.py
+FEATURE_COLS = ['tacklerDepth', 'ballCarrierDepth', 'dist_ballCarrier_tackler', 'dist_ballCarrier_tackler_x',
+                'convergence_rate_by_tackler', 'convergence_rate_x_by_tackler', 'sin_o_sum', 'sin_dir_sum',
+                's_tacklerTowardBallCarrier_by_tackler', 'causal_smoothed_expected_intersection_x',
+                'closest_defender_1', 'closest_defender_2', 'closest_defender_3',
+                'closest_offensive_1', 'closest_offensive_2', 'closest_offensive_3',
+                'ballcarrier_closest_indicator', 'num_off_player_between']
+
+MODEL_PATH = 'data/streaming_model.npz'
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-z))
+
+
+class LstmStepper():
+    """
+    NumPy version of the Masking -> LSTM -> TimeDistributed(Dense(1)) model of model.ipynb that advances
+    the recurrent state one frame at a time for a batch of sequences. Gates are in the Keras order i, f, c, o.
+    """
+    def __init__(self, kernel, recurrent_kernel, bias, dense_kernel, dense_bias, mask_value=0.):
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias
+        self.dense_kernel = dense_kernel
+        self.dense_bias = dense_bias
+        self.mask_value = mask_value
+        self.units = recurrent_kernel.shape[0]
+
+    def initial_state(self, n):
+        return np.zeros((n, self.units)), np.zeros((n, self.units))
+
+    def step(self, x, h, c):
+        """Advance the states (h, c) of n sequences by one frame x (n, n_features), returning y, h, c."""
+        z = x @ self.kernel + h @ self.recurrent_kernel + self.bias
+        i, f, g, o = np.split(z, 4, axis=1)
+        c_new = _sigmoid(f) * c + _sigmoid(i) * np.tanh(g)
+        h_new = _sigmoid(o) * np.tanh(c_new)
+
+        # Like the Masking layer, frames with all features equal to mask_value leave the state unchanged
+        masked = np.all(x == self.mask_value, axis=1)[:, None]
+        h_new = np.where(masked, h, h_new)
+        c_new = np.where(masked, c, c_new)
+
+        y = (h_new @ self.dense_kernel + self.dense_bias)[:, 0]
+        return y, h_new, c_new
+
+    def predict(self, X):
+        """Outputs (n, max_len) of the post-padded sequences X (n, max_len, n_features), like model.predict."""
+        h, c = self.initial_state(len(X))
+        y = np.empty(X.shape[:2])
+        for t in range(X.shape[1]):
+            y[:, t], h, c = self.step(X[:, t], h, c)
+        return y
+
+
+class TacklerStates():
+    """
+    Incremental per-(play, tackler) state: previous distances, expected intersection history and LSTM state.
+    Only frames in which a tackler is found update its state, like the rows of x the model is trained on.
+    """
+    def __init__(self, tacklerIds, ballCarrierId, los, h, c, history):
+        self.tacklerIds = tacklerIds
+        self.ballCarrierId = ballCarrierId
+        self.los = los
+        self.prev_distance = np.full(len(tacklerIds), np.nan)
+        self.prev_distance_x = np.full(len(tacklerIds), np.nan)
+        self.expected_intersection = np.full((history, len(tacklerIds)), np.nan) # (lag, tackler), newest first
+        self.n_expected_intersection = np.zeros(len(tacklerIds), dtype='int64') # filled lags of every tackler
+        self.h = h
+        self.c = c
+
+    def add_expected_intersection(self, values, found):
+        """Shift the history of the found tacklers by one frame and insert their values as lag 0."""
+        history = self.expected_intersection
+        history[1:, found] = history[:-1, found]
+        history[0, found] = values[found]
+        self.n_expected_intersection[found] = np.minimum(self.n_expected_intersection[found] + 1, len(history))
+
+
+class StreamingPredictor():
+    """
+    Frame by frame tackle-line prediction for live plays. Every frame only updates the state of its play,
+    all features are causal (they depend on the current and earlier frames only) and the LSTM state is
+    stepped instead of re-running the full sequence, so the work per frame does not grow with the play.
+
+    The model is the one model.ipynb trains on FEATURE_COLS, whose convergence and smoothed expected intersection
+    are computed per tackler from earlier frames only (tackler_convergence and causal_expected_intersection of
+    the feature registry), so replaying a play gives the offline predictions of that model.
+    """
+    def __init__(self, lstm, scaler_mean, scaler_scale, sigma=2):
+        self.lstm = lstm
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.weights = causal_gaussian_weights(sigma)
+        self.plays = {}
+        self.latencies = []
+
+    @classmethod
+    def from_keras(cls, model, scaler, sigma=2):
+        """Predictor from the trained Keras model and the fitted StandardScaler of model.ipynb."""
+        lstm_layer = next(layer for layer in model.layers if 'lstm' in layer.name)
+        dense_layer = next(layer for layer in model.layers if 'time_distributed' in layer.name)
+        mask_layer = next((layer for layer in model.layers if 'masking' in layer.name), None)
+        lstm = LstmStepper(*lstm_layer.get_weights(), *dense_layer.get_weights(),
+                           mask_value=mask_layer.mask_value if mask_layer is not None else np.nan)
+        return cls(lstm, scaler.mean_, scaler.scale_, sigma)
+
+    def save(self, path=MODEL_PATH):
+        """Save weights and scaler as npz, so the predictor can run without tensorflow."""
+        lstm = self.lstm
+        np.savez(path, kernel=lstm.kernel, recurrent_kernel=lstm.recurrent_kernel, bias=lstm.bias,
+                 dense_kernel=lstm.dense_kernel, dense_bias=lstm.dense_bias, mask_value=lstm.mask_value,
+                 scaler_mean=self.scaler_mean, scaler_scale=self.scaler_scale, weights=self.weights)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path) as f:
+            lstm = LstmStepper(f['kernel'], f['recurrent_kernel'], f['bias'], f['dense_kernel'], f['dense_bias'],
+                               mask_value=float(f['mask_value']))
+            predictor = cls(lstm, f['scaler_mean'], f['scaler_scale'])
+            predictor.weights = f['weights']
+        return predictor
+
+    def start_play(self, gameId, playId, ballCarrierId, absoluteYardlineNumber, tacklerIds):
+        """
+        Start tracking a play. absoluteYardlineNumber is as in plays.csv (frames are normalized to go right
+        in process_frame), tacklerIds are the defenders to predict for.
+        """
+        tacklerIds = np.asarray(tacklerIds, dtype='float64')
+        h, c = self.lstm.initial_state(len(tacklerIds))
+        self.plays[(gameId, playId)] = TacklerStates(tacklerIds, float(ballCarrierId), float(absoluteYardlineNumber),
+                                                     h, c, len(self.weights))
+
+    def end_play(self, gameId, playId):
+        self.plays.pop((gameId, playId), None)
+
+    def frame_features(self, state, nflId, club, x, y, o, dir, los):
+        """
+        Feature matrix (n_tacklers, len(FEATURE_COLS)) of one frame normalized to go right (los is the
+        normalized line of scrimmage), updating the causal state of the play.
+        """
+        n = len(state.tacklerIds)
+        tackler_slot = _slots(nflId, state.tacklerIds)
+        ballCarrier_slot = _slots(nflId, [state.ballCarrierId])[0]
+        found = (tackler_slot >= 0) & (ballCarrier_slot >= 0)
+        t_slot = np.maximum(tackler_slot, 0)
+        b_slot = max(ballCarrier_slot, 0)
+
+        x_tackler = np.where(found, x[t_slot], np.nan)
+        y_tackler = np.where(found, y[t_slot], np.nan)
+        x_ballCarrier, y_ballCarrier = np.full(n, x[b_slot]), np.full(n, y[b_slot])
+
+        dist = np.sqrt((x_tackler - x_ballCarrier)**2 + (y_tackler - y_ballCarrier)**2)
+        dist_x = x_tackler - x_ballCarrier
+
+        # Convergence uses the tackler's previous frame, which is 1 / 0 on the first frame as in the notebook
+        first = np.isnan(state.prev_distance)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            convergence_rate = np.where(first, 1, state.prev_distance / dist)
+            convergence_rate_x = np.where(first, 1, state.prev_distance_x / dist_x)
+        s_toward = np.where(first, 0, (state.prev_distance - dist) / .1)
+        state.prev_distance = np.where(found, dist, state.prev_distance)
+        state.prev_distance_x = np.where(found, dist_x, state.prev_distance_x)
+
+        # Expected intersection smoothed over the current and previous frames of the tackler only
+        expected_intersection = calculate_intersection_batch(x_tackler, y_tackler, dir[t_slot],
+                                                             x_ballCarrier, y_ballCarrier, np.full(n, dir[b_slot]),
+                                                             np.full(n, los))
+        state.add_expected_intersection(expected_intersection, found)
+        filled = np.arange(len(self.weights))[:, None] < state.n_expected_intersection
+        weights = np.where(filled, self.weights[:, None], 0)
+        with np.errstate(invalid='ignore'):
+            smoothed = (weights * np.where(filled, state.expected_intersection, 0)).sum(axis=0) / weights.sum(axis=0)
+
+        # Closest defenders / offensive players of the tackler and players between tackler and ballCarrier
+        clubs = np.broadcast_to(club, (n, len(club)))
+        tackler_club = club[t_slot][:, None]
+        is_tackler = np.arange(len(club)) == t_slot[:, None]
+        px, py = np.broadcast_to(x, clubs.shape), np.broadcast_to(y, clubs.shape)
+        player_dist = np.sqrt((px - x_tackler[:, None])**2 + (py - y_tackler[:, None])**2)
+        closest_defenders, _ = k_smallest(player_dist, (clubs == tackler_club) & ~is_tackler, 3)
+        closest_offensive, offensive_slots = k_smallest(player_dist, clubs != tackler_club, 3)
+        indicator = (offensive_slots == ballCarrier_slot).any(axis=1)
+
+        offensive = (clubs == club[b_slot]) & (np.arange(len(club)) != b_slot)
+        between = (offensive & _in_corridor(px, py, x_tackler, y_tackler, x_ballCarrier, y_ballCarrier, 'box', 2)).sum(axis=1)
+
+        features = np.column_stack([
+            x_tackler - los, x_ballCarrier - los, dist, dist_x,
+            convergence_rate, convergence_rate_x,
+            np.sin(np.radians(o[t_slot])) + np.sin(np.radians(o[b_slot])),
+            np.sin(np.radians(dir[t_slot])) + np.sin(np.radians(dir[b_slot])),
+            s_toward, smoothed, closest_defenders, closest_offensive, indicator, between])
+        features[~found] = np.nan
+        return features, found
+
+    def process_frame(self, frame):
+        """
+        Predict playResult for the tacklers of the play of one frame of tracking rows (one (gameId, playId,
+        frameId), raw tracking_week_N.csv columns). Returns gameId, playId, frameId, tacklerId, pred_playResult.
+        """
+        start = time.perf_counter()
+        gameId, playId, frameId = (int(frame[col].iat[0]) for col in ['gameId', 'playId', 'frameId'])
+        state = self.plays[(gameId, playId)]
+
+        nflId = frame['nflId'].to_numpy(dtype='float64')
+        club = frame['club'].to_numpy(dtype=object)
+        x = frame['x'].to_numpy(dtype='float64')
+        y = frame['y'].to_numpy(dtype='float64')
+
+        # Normalize plays to go towards the right, as load_tracking(normalize=True)
+        los = state.los
+        if frame['playDirection'].iat[0] == 'left':
+            x, y, los = 110 - x, 53.3 - y, 110 - los
+
+        features, found = self.frame_features(state, nflId, club, x, y, frame['o'].to_numpy(dtype='float64'),
+                                              frame['dir'].to_numpy(dtype='float64'), los)
+
+        # Missing and infinite values are filled with the training mean, which scales to 0
+        scaled = (features - self.scaler_mean) / self.scaler_scale
+        scaled[~np.isfinite(scaled)] = 0
+
+        pred, h, c = self.lstm.step(scaled, state.h, state.c)
+        state.h = np.where(found[:, None], h, state.h)
+        state.c = np.where(found[:, None], c, state.c)
+
+        predictions = pd.DataFrame({'gameId': gameId, 'playId': playId, 'frameId': frameId,
+                                    'tacklerId': state.tacklerIds, 'pred_playResult': np.where(found, pred, np.nan)})
+        self.latencies.append(time.perf_counter() - start)
+        return predictions
+
+    def latency_summary(self):
+        """p50 / p99 / max per-frame latency in milliseconds."""
+        latencies = np.array(self.latencies) * 1000
+        return {'frames': len(latencies), 'p50_ms': np.percentile(latencies, 50),
+                'p99_ms': np.percentile(latencies, 99), 'max_ms': latencies.max()}
+
+
+def _slots(nflId, ids):
+    """Index of each id in the frame's nflId array, -1 where the player is not in the frame."""
+    is_player = nflId[None, :] == np.asarray(ids, dtype='float64')[:, None]
+    slots = is_player.argmax(axis=1)
+    slots[~is_player.any(axis=1)] = -1
+    return slots
+
+
+def replay(predictor, df_tracking, plays, rate_hz=None):
+    """
+    Feed df_tracking frame by frame (in time order per play) to predictor, optionally paced at rate_hz
+    frames per second like a live feed. plays holds gameId, playId, ballCarrierId, absoluteYardlineNumber
+    and one row per tacklerId to predict for. Returns the predictions of all frames.
+    """
+    tacklers = plays.groupby(['gameId', 'playId'], sort=False)
+    df_tracking = df_tracking.merge(plays[['gameId', 'playId']].drop_duplicates(), on=['gameId', 'playId'])
+    df_tracking = df_tracking.sort_values(['gameId', 'playId', 'frameId'], kind='stable', ignore_index=True)
+
+    codes = df_tracking.groupby(['gameId', 'playId', 'frameId'], sort=False).ngroup().to_numpy()
+    bounds = np.r_[0, np.flatnonzero(np.diff(codes)) + 1, len(codes)]
+
+    results = []
+    current_play = None
+    next_time = time.perf_counter()
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        frame = df_tracking.iloc[start:end]
+        play = (int(frame['gameId'].iat[0]), int(frame['playId'].iat[0]))
+        if play != current_play:
+            if current_play is not None:
+                predictor.end_play(*current_play)
+            group = tacklers.get_group(play)
+            predictor.start_play(*play, group['ballCarrierId'].iat[0], group['absoluteYardlineNumber'].iat[0],
+                                 group['tacklerId'].to_numpy())
+            current_play = play
+
+        if rate_hz is not None:
+            next_time += 1 / rate_hz
+            time.sleep(max(next_time - time.perf_counter(), 0))
+        results.append(predictor.process_frame(frame))
+
+    return pd.concat(results, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a week of tracking data through the streaming tackle-line predictor.')
+    parser.add_argument('--week', type=int, default=9)
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--model', default=MODEL_PATH, help='npz written by StreamingPredictor.save in model.ipynb')
+    parser.add_argument('--rate-hz', type=float, default=None, help='pace the replay like a live feed (e.g. 10)')
+    parser.add_argument('--out', default=None, help='write the per-frame predictions to this pickle')
+    args = parser.parse_args()
+
+    predictor = StreamingPredictor.load(args.model)
+    df_tracking = load_tracking(args.data_dir, weeks=[args.week], add_key=False)
+
+    # Predict for the tacklers of tackles.csv, like the offline model
+    df_plays = pd.read_csv(os.path.join(args.data_dir, 'plays.csv'))
+    df_tackles = pd.read_csv(os.path.join(args.data_dir, 'tackles.csv')).rename({'nflId': 'tacklerId'}, axis=1)
+    plays = df_tackles[['gameId', 'playId', 'tacklerId']].merge(
+        df_plays[['gameId', 'playId', 'ballCarrierId', 'absoluteYardlineNumber']], on=['gameId', 'playId'])
+    plays = plays[plays['gameId'].isin(df_tracking['gameId'].unique())]
+
+    predictions = replay(predictor, df_tracking, plays, rate_hz=args.rate_hz)
+    summary = predictor.latency_summary()
+    print(f"{summary['frames']:,} frames: p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, "
+          f"max {summary['max_ms']:.2f} ms per frame")
+
+    if args.out:
+        predictions.to_pickle(args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'feature_gen'), os.path.join(ROOT, 'benchmarks')]
+
+from synthetic import make_tracking, make_x
+
+
+@pytest.fixture(scope='session')
+def synthetic():
+    """Small synthetic tracking data (2 games of 3 plays), its plays and the x rows of the tacklers."""
+    tracking, plays = make_tracking(n_games=2, plays_per_game=3)
+    return tracking, plays, make_x(tracking, plays)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from all_defenders import all_defender_features, predict_all_defenders
+from features import REGISTRY
+from feature_cache import FeatureCache, build_features
+from streaming_inference import LstmStepper, StreamingPredictor, FEATURE_COLS
+from synthetic import make_x
+from tracking_loader import normalize_play_direction
+
+KEYS = ['gameId', 'playId', 'frameId', 'tacklerId']
+
+
+def test_tackler_rows_match_registry_features(synthetic, tmp_path):
+    tracking, plays, _ = synthetic
+    normalized = normalize_play_direction(tracking.copy())
+    x = make_x(normalized, plays)
+    x = build_features(x, REGISTRY, cache=FeatureCache(str(tmp_path / 'cache')), tracking=normalized)
+
+    features = all_defender_features(normalized, plays)
+    # Every defender of every frame, 11 per frame
+    assert len(features) == 11 * normalized.drop_duplicates(['gameId', 'playId', 'frameId']).shape[0]
+
+    merged = x[KEYS + FEATURE_COLS].merge(features, on=KEYS, suffixes=('', '_all'), validate='1:1')
+    assert len(merged) == len(x)
+    for col in FEATURE_COLS:
+        np.testing.assert_allclose(merged[f'{col}_all'].to_numpy(dtype='float64'), merged[col].to_numpy(dtype='float64'),
+                                   rtol=1e-9, atol=1e-9, err_msg=col)
+
+
+def test_predictions_match_sequence_by_sequence(synthetic):
+    tracking, plays, _ = synthetic
+    features = all_defender_features(normalize_play_direction(tracking.copy()), plays)
+
+    rng = np.random.default_rng(0)
+    n, units = len(FEATURE_COLS), 4
+    lstm = LstmStepper(rng.normal(0, .3, (n, 4 * units)), rng.normal(0, .3, (units, 4 * units)),
+                       rng.normal(0, .1, 4 * units), rng.normal(0, 1, (units, 1)), rng.normal(0, 1, 1), mask_value=0.)
+    predictor = StreamingPredictor(lstm, np.zeros(n), np.full(n, 10.))
+    predictions = predict_all_defenders(features, predictor, batch_size=7)
+
+    scaled = features[FEATURE_COLS].to_numpy(dtype='float64') / 10
+    scaled[~np.isfinite(scaled)] = 0
+    for rows in list(features.groupby(['gameId', 'playId', 'tacklerId']).indices.values())[::10]:
+        expected = lstm.predict(scaled[rows][None])[0]
+        np.testing.assert_allclose(predictions['pred_playResult'].to_numpy()[rows], expected, rtol=1e-6, atol=1e-9)
+    pd.testing.assert_frame_equal(predictions[KEYS], features[KEYS])
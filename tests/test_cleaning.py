@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cleaning import clean_tracking, end_of_play_events, event_counts, trim_plays, TRACKING_NEW_DROP
+from nearest_defenders_and_offesnive import find_closest_players_and_ballcarrier_indicator_batch
+from num_offensive_player_between import num_offensive_players_between_batch, TRACKING_COLS
+from tracking_loader import add_play_key, normalize_play_direction
+from tracking_store import read_tracking
+
+
+@pytest.fixture
+def tracking(synthetic):
+    """Normalized tracking data as load_tracking reads it: play key, nullable Int32 nflId, categorical event."""
+    df = add_play_key(normalize_play_direction(synthetic[0].copy()))
+    df['nflId'] = df['nflId'].astype('Int32')
+    df['event'] = df['event'].astype('category')
+    # Plays without an event 4 frames before their last frame keep all their frames
+    last_play = df['key'] == df['key'].iloc[-1]
+    df.loc[last_play, 'event'] = np.nan
+    return df
+
+
+def notebook_cleaning(df_tracking, keys):
+    """eventCounts, nanKeys and df_tracking_new with the per-play loops of model.ipynb."""
+    eventCounts, nanKeys = {}, []
+    for key in keys:
+        frameId_max = df_tracking.query('key==@key').frameId.unique().max()
+        event = df_tracking.query('key==@key').head(frameId_max).reset_index(drop=True).event[frameId_max-5]
+        eventCounts[event] = eventCounts.get(event, 0) + 1
+        if not event == event:
+            nanKeys.append(key)
+
+    filtered_dfs = []
+    for key in keys:
+        df_qry = df_tracking[df_tracking['key'] == key]
+        frameId_max = df_qry['frameId'].max() - (4 if key not in nanKeys else 0)
+        filtered_dfs.append(df_qry[df_qry['frameId'] <= frameId_max])
+    df_tracking_new = pd.concat(filtered_dfs, axis=0).reset_index(drop=True).drop(TRACKING_NEW_DROP, axis=1)
+    return eventCounts, nanKeys, df_tracking_new
+
+
+def test_clean_tracking_matches_notebook_loops(tracking):
+    keys = tracking['key'].unique()[::-1]
+    df_tracking_new, eventCounts, nanKeys = clean_tracking(tracking, pd.DataFrame({'key': keys}))
+    expected_counts, expected_nanKeys, expected = notebook_cleaning(tracking, keys)
+
+    assert nanKeys == expected_nanKeys == [tracking['key'].iloc[-1]]
+    assert {k: v for k, v in eventCounts.items() if k == k} == {k: v for k, v in expected_counts.items() if k == k}
+    assert event_counts(end_of_play_events(tracking, keys)) == eventCounts
+    assert len(df_tracking_new) == len(trim_plays(tracking, keys, nanKeys)) == len(expected)
+    pd.testing.assert_frame_equal(df_tracking_new, expected.assign(nflId=expected['nflId'].astype('float64')))
+
+
+def test_cleaned_pickle_feeds_feature_gen(tracking, synthetic, tmp_path):
+    x = synthetic[2]
+    df_tracking_new = clean_tracking(tracking, pd.DataFrame({'key': tracking['key'].unique()}))[0]
+    assert df_tracking_new['nflId'].dtype == 'float64' and df_tracking_new['nflId'].isna().any()
+
+    df_tracking_new.to_pickle(tmp_path / 'tracking_new.pkl')
+    tracking_df = read_tracking(str(tmp_path / 'tracking_new.pkl'), TRACKING_COLS)
+    reference = df_tracking_new.assign(club=df_tracking_new['club'].astype(str))[TRACKING_COLS]
+
+    x = x[x.set_index(['gameId', 'playId', 'frameId']).index.isin(
+        reference.set_index(['gameId', 'playId', 'frameId']).index)].reset_index(drop=True)
+    pd.testing.assert_series_equal(num_offensive_players_between_batch(x, tracking_df),
+                                   num_offensive_players_between_batch(x, reference))
+    pd.testing.assert_frame_equal(find_closest_players_and_ballcarrier_indicator_batch(x, tracking_df),
+                                  find_closest_players_and_ballcarrier_indicator_batch(x, reference))
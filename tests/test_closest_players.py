@@ -0,0 +1,22 @@
+import numpy as np
+
+from nearest_defenders_and_offesnive import (find_closest_players_and_ballcarrier_indicator,
+                                             find_closest_players_and_ballcarrier_indicator_batch, CLOSEST_PLAYER_COLS)
+
+
+def test_batch_matches_rowwise(synthetic):
+    tracking, _, x = synthetic
+    rows = x.iloc[::7]
+
+    expected = np.array([find_closest_players_and_ballcarrier_indicator(row, tracking) for _, row in rows.iterrows()])
+    results = find_closest_players_and_ballcarrier_indicator_batch(rows, tracking)
+
+    assert list(results.columns) == CLOSEST_PLAYER_COLS
+    assert results.index.equals(rows.index)
+    np.testing.assert_allclose(results.to_numpy(dtype='float64'), expected)
+
+
+def test_batch_with_small_chunks(synthetic):
+    tracking, _, x = synthetic
+    np.testing.assert_array_equal(find_closest_players_and_ballcarrier_indicator_batch(x, tracking, chunk_size=50).to_numpy(),
+                                  find_closest_players_and_ballcarrier_indicator_batch(x, tracking).to_numpy())
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from evaluation import evaluate, evaluate_padded, frame_buckets, sequence_lengths, unpad
+from sequence_data import PADDING_VALUE
+
+
+def r2_score(y_true, y_pred):
+    return 1 - ((y_true - y_pred)**2).sum() / ((y_true - y_true.mean())**2).sum()
+
+
+@pytest.fixture
+def padded():
+    """Padded Y_test / predictions like model.ipynb, with short sequences whose bucket edges round differently."""
+    rng = np.random.default_rng(0)
+    lengths = np.r_[1, 2, 3, 7, 10, 11, rng.integers(5, 60, 44)]
+    Y = np.full((len(lengths), lengths.max(), 1), PADDING_VALUE, dtype='float32')
+    predictions = rng.normal(5, 4, Y.shape).astype('float32')
+    for i, length in enumerate(lengths):
+        Y[i, :length, 0] = rng.integers(-3, 20) + rng.normal(0, 2, length)
+    return Y, predictions
+
+
+def notebook_buckets(Y, predictions, i):
+    """Frames of the i-th 10% of every sequence, with the loop of the evaluation cells of model.ipynb."""
+    true_arr, pred_arr = np.array([]), np.array([])
+    for cntr, (y_true, y_pred) in enumerate(zip(Y, predictions)):
+        y_true = y_true.flatten()
+        num_frames = len(y_true[y_true != PADDING_VALUE])
+        start_idx = int(np.floor(num_frames*i)) if (cntr%2)==0 else int(np.ceil(num_frames*i))
+        end_idx = int(np.floor(num_frames*round(i+.1,1))) if (cntr%2)==0 else int(np.ceil(num_frames*round(i+.1,1)))
+        true_arr = np.append(true_arr, y_true[start_idx:end_idx])
+        pred_arr = np.append(pred_arr, y_pred[start_idx:end_idx])
+    return true_arr, pred_arr
+
+
+def test_buckets_and_metrics_match_notebook_loops(padded):
+    Y, predictions = padded
+    lengths = sequence_lengths(Y)
+    y_true, y_pred = unpad(Y, lengths).astype('float64'), unpad(predictions, lengths).astype('float64')
+    buckets = frame_buckets(lengths)
+    results = evaluate_padded(Y, predictions)
+
+    for b, i in enumerate([round(i * 0.1, 1) for i in range(10)]):
+        true_arr, pred_arr = notebook_buckets(Y, predictions, i)
+        np.testing.assert_array_equal(y_true[buckets == b], true_arr)
+        np.testing.assert_array_equal(y_pred[buckets == b], pred_arr)
+        assert results.loc[i, 'n_frames'] == len(true_arr)
+        assert results.loc[i, 'r2'] == pytest.approx(r2_score(true_arr, pred_arr), rel=1e-9)
+        assert results.loc[i, 'mae'] == pytest.approx(np.abs(true_arr - pred_arr).mean(), rel=1e-9)
+
+    assert results.loc['all', 'r2'] == pytest.approx(r2_score(y_true, y_pred), rel=1e-9)
+    assert results.loc['all', 'mae'] == pytest.approx(np.abs(y_true - y_pred).mean(), rel=1e-9)
+
+
+def test_bootstrap_is_deterministic(padded):
+    Y, predictions = padded
+    lengths = sequence_lengths(Y)
+    args = unpad(Y, lengths), unpad(predictions, lengths), lengths
+
+    first = evaluate(*args, n_bootstrap=250, seed=1, workers=1)
+    pd.testing.assert_frame_equal(first, evaluate(*args, n_bootstrap=250, seed=1, workers=4))
+    assert not first['r2_low'].equals(evaluate(*args, n_bootstrap=250, seed=2)['r2_low'])
+
+    # Intervals contain the point estimates
+    assert ((first['r2_low'] <= first['r2']) & (first['r2'] <= first['r2_high'])).all()
+    assert ((first['mae_low'] <= first['mae']) & (first['mae'] <= first['mae_high'])).all()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.ndimage import gaussian_filter1d
+
+from expected_intersection import calculate_intersection_batch, smooth_by_play, causal_smooth_by_play, causal_gaussian_weights
+
+
+def calculate_intersection(row):
+    """calculate_intersection of model.ipynb."""
+    x1, y1, dir1 = row['x_tackler'], row['y_tackler'], row['dir_tackler']
+    x2, y2, dir2 = row['x_ballCarrier'], row['y_ballCarrier'], row['dir_ballCarrier']
+    dir1_rad = np.radians(90 - dir1)
+    dir2_rad = np.radians(90 - dir2)
+    m1 = np.tan(dir1_rad)
+    m2 = np.tan(dir2_rad)
+    if m1 == m2:
+        return np.mean([x1, x2]) - row['absoluteYardlineNumber']
+    x_inter = (m1 * x1 - m2 * x2 - y1 + y2) / (m1 - m2)
+    val = x_inter - row['absoluteYardlineNumber']
+    if (((x_inter >= x1) == (np.cos(dir1_rad) >= 0)) and ((x_inter >= x2) == (np.cos(dir2_rad) >= 0)) and
+            val >= -10 and val <= 50):
+        return val
+    return np.mean([x1, x2]) - row['absoluteYardlineNumber']
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(0)
+    n = 500
+    random = pd.DataFrame({
+        'x_tackler': rng.uniform(20, 80, n), 'y_tackler': rng.uniform(0, 53.3, n), 'dir_tackler': rng.uniform(0, 360, n),
+        'x_ballCarrier': rng.uniform(20, 80, n), 'y_ballCarrier': rng.uniform(0, 53.3, n), 'dir_ballCarrier': rng.uniform(0, 360, n),
+        'absoluteYardlineNumber': rng.uniform(20, 60, n)})
+    base = {'x_tackler': 40., 'y_tackler': 20., 'x_ballCarrier': 30., 'y_ballCarrier': 30., 'absoluteYardlineNumber': 35.}
+    cases = pd.DataFrame([
+        dict(base, dir_tackler=45., dir_ballCarrier=45.),        # parallel
+        dict(base, dir_tackler=90., dir_ballCarrier=270.),       # parallel, opposite directions
+        dict(base, dir_tackler=0., dir_ballCarrier=90.),         # vertical tackler heading
+        dict(base, dir_tackler=180., dir_ballCarrier=0.),        # both (anti)parallel and vertical
+        dict(base, dir_tackler=359.999, dir_ballCarrier=135.),   # near vertical
+        dict(base, dir_tackler=270., dir_ballCarrier=135.),      # intersection behind the tackler
+        dict(base, dir_tackler=315., dir_ballCarrier=45.),       # intersection in front of both
+        dict(base, dir_tackler=225., dir_ballCarrier=315.),      # intersection behind the ballCarrier
+        dict(base, dir_tackler=np.nan, dir_ballCarrier=90.),     # missing direction
+    ])
+    return pd.concat([random, cases], ignore_index=True)
+
+
+def test_intersection_matches_notebook(rows):
+    expected = rows.apply(calculate_intersection, axis=1).to_numpy()
+    result = calculate_intersection_batch(*[rows[col] for col in ['x_tackler', 'y_tackler', 'dir_tackler', 'x_ballCarrier',
+                                                                  'y_ballCarrier', 'dir_ballCarrier', 'absoluteYardlineNumber']])
+    np.testing.assert_array_equal(result, expected)
+    # Parallel headings and intersections behind a player fall back to the mean x
+    fallback = (rows['x_tackler'] + rows['x_ballCarrier']) / 2 - rows['absoluteYardlineNumber']
+    for case in [500, 501, 503, 505, 507]:
+        assert result[case] == fallback[case]
+    assert result[506] != fallback[506]
+
+
+def test_smoothing_matches_groupby(synthetic):
+    x = synthetic[2][['gameId', 'playId', 'frameId']].copy()
+    x['value'] = np.random.default_rng(0).normal(size=len(x))
+    x = x.sample(frac=1, random_state=0) # plays interleaved
+
+    expected = x.groupby(['gameId', 'playId'])['value'].transform(lambda s: gaussian_filter1d(s, sigma=2))
+    np.testing.assert_allclose(smooth_by_play(x, 'value', sigma=2), expected.to_numpy(), rtol=1e-12)
+
+    # Causal: weighted mean of the current and earlier rows of the play
+    weights = causal_gaussian_weights(2)
+    def causal(s):
+        values = s.to_numpy()
+        return [np.average(values[max(i - len(weights) + 1, 0):i + 1][::-1], weights=weights[:min(i + 1, len(weights))])
+                for i in range(len(values))]
+    expected = x.groupby(['gameId', 'playId'])['value'].transform(causal)
+    np.testing.assert_allclose(causal_smooth_by_play(x, 'value', sigma=2), expected.to_numpy(), rtol=1e-12)
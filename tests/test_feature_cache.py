@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_cache import FeatureCache, FeatureRegistry, build_features
+from features import REGISTRY, distances, angles
+
+
+def test_cache_round_trip(tmp_path):
+    cache = FeatureCache(str(tmp_path))
+    columns = {'a': np.arange(5), 'b': np.array([.5, np.nan])}
+    assert cache.get('feature', 'key') is None
+
+    cache.put('feature', 'key', columns)
+    loaded = cache.get('feature', 'key')
+    assert loaded.keys() == columns.keys()
+    for col, values in columns.items():
+        np.testing.assert_array_equal(loaded[col], values)
+        assert loaded[col].dtype == values.dtype
+    assert not any(file.endswith('.tmp') for file in os.listdir(tmp_path / 'feature'))
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = FeatureCache(str(tmp_path))
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put('feature', key, {'values': np.zeros(1000)})
+        os.utime(cache.path('feature', key), (i, i))
+    cache.get('feature', 'a') # a hit makes 'a' the most recently used entry
+
+    size = os.path.getsize(cache.path('feature', 'a'))
+    cache.max_bytes = 2 * size
+    assert cache.evict() == 1
+    assert cache.get('feature', 'b') is None
+    assert cache.get('feature', 'a') is not None and cache.get('feature', 'c') is not None
+
+
+def _registry(calls):
+    registry = FeatureRegistry()
+
+    @registry.register(inputs=['gameId', 'v'], outputs=['count'])
+    def count(x):
+        calls.append(x['gameId'].iat[0])
+        # Integer counts, NaN for the last game
+        if x['gameId'].iat[0] == 3:
+            return pd.Series(np.nan, index=x.index)
+        return x['v'].astype('int64') * 2
+
+    @registry.register(inputs=['count'], outputs=['count_plus_one'])
+    def count_plus_one(x):
+        return x['count'] + 1
+
+    return registry
+
+
+def test_build_features_promotes_dtypes_and_reuses_cache(tmp_path):
+    x = pd.DataFrame({'gameId': [2, 1, 2, 1, 3], 'v': [1, 2, 3, 4, 5]})
+    calls = []
+    registry = _registry(calls)
+    cache = FeatureCache(str(tmp_path))
+
+    result = build_features(x, registry, cache=cache)
+    assert result['count'].dtype == 'float64'
+    np.testing.assert_array_equal(result['count'], [2, 4, 6, 8, np.nan])
+    np.testing.assert_array_equal(result['count_plus_one'], [3, 5, 7, 9, np.nan])
+    assert sorted(calls) == [1, 2, 3]
+
+    # Unchanged games are read from the cache, only the changed game is computed again
+    calls.clear()
+    x.loc[0, 'v'] = 10
+    result = build_features(x, registry, cache=cache)
+    assert calls == [2]
+    np.testing.assert_array_equal(result['count'], [20, 4, 6, 8, np.nan])
+
+
+def test_registry_features_match_whole_frame(synthetic, tmp_path):
+    x = synthetic[2].sample(frac=1, random_state=0).reset_index(drop=True)
+    result = build_features(x, REGISTRY, ['distances', 'angles'], cache=FeatureCache(str(tmp_path)))
+    expected = pd.concat([distances(x), angles(x)], axis=1)
+    pd.testing.assert_frame_equal(result[expected.columns], expected)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from leaderboard import Leaderboard, map_to_weights, score_plays
+from synthetic import make_tracking, make_x, make_predictions
+
+R2_WEIGHTS = {round(i * 0.1, 1): 0.1 + i / 20 for i in range(10)}
+
+
+def map_to_weight(p):
+    """map_to_weight of model.ipynb."""
+    key = int(p * 10) / 10
+    if key == 1.0:
+        key = 0.9
+    return R2_WEIGHTS[key]
+
+
+def test_map_to_weights_matches_notebook():
+    edges = [i / 10 for i in range(11)] + [round(i * 0.1, 1) for i in range(11)] + [i * 0.1 for i in range(11)]
+    percentiles = np.r_[0, 1, edges, np.nextafter(edges, 0)[1:], np.nextafter(edges, 1)[:-1],
+                        np.random.default_rng(0).uniform(size=100)]
+    np.testing.assert_array_equal(map_to_weights(percentiles, R2_WEIGHTS), [map_to_weight(p) for p in percentiles])
+
+
+@pytest.fixture(scope='module')
+def predictions():
+    tracking, plays = make_tracking(n_games=3, plays_per_game=4, seed=1)
+    # Several plays per tackler, so that per player aggregates combine plays of different games
+    plays['tacklerId'] = 50000 + np.arange(len(plays)) % 3
+    return make_predictions(make_x(tracking, plays))
+
+
+def test_update_replaces_rescored_plays(predictions):
+    week1 = predictions[predictions.gameId != predictions.gameId.max()]
+    week2 = predictions[predictions.gameId == predictions.gameId.max()]
+    rescored = week2.assign(pred_playResult=week2['pred_playResult'] + 3)
+
+    leaderboard = Leaderboard(R2_WEIGHTS)
+    leaderboard.update(week1)
+    leaderboard.update(week2)
+    leaderboard.update(rescored)
+
+    expected = Leaderboard(R2_WEIGHTS)
+    expected.update(pd.concat([week1, rescored]))
+    assert len(leaderboard.play_scores) == len(expected.play_scores) == predictions.groupby(['gameId', 'playId', 'tacklerId']).ngroups
+    pd.testing.assert_frame_equal(leaderboard.players.sort_index(), expected.players.sort_index(), check_exact=False)
+
+    # Aggregates equal those recomputed from the stored play scores
+    scores = score_plays(pd.concat([week1, rescored]), R2_WEIGHTS)
+    recomputed = scores.groupby('tacklerId')['YSOE'].agg(['sum', 'count'])
+    np.testing.assert_allclose(leaderboard.players.loc[recomputed.index, 'YSOE_sum'], recomputed['sum'])
+    np.testing.assert_array_equal(leaderboard.players.loc[recomputed.index, 'tackle_count'], recomputed['count'])
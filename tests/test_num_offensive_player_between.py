@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from num_offensive_player_between import (num_offensive_players_between_tackler_and_ballCarrier,
+                                          num_offensive_players_between_batch, _in_corridor, feature_name, CORRIDORS)
+
+
+def test_batch_matches_rowwise(synthetic):
+    tracking, _, x = synthetic
+    rows = x.iloc[::7]
+
+    expected = [num_offensive_players_between_tackler_and_ballCarrier(row, tracking) for _, row in rows.iterrows()]
+    results = num_offensive_players_between_batch(rows, tracking)
+
+    assert results.index.equals(rows.index)
+    np.testing.assert_array_equal(results.to_numpy(), expected)
+
+
+def test_cone_is_inside_rectangle(synthetic):
+    tracking, _, x = synthetic
+    rectangle = num_offensive_players_between_batch(x, tracking, 'rectangle', half_width=2)
+    assert (num_offensive_players_between_batch(x, tracking, 'cone', half_width=2) <= rectangle).all()
+
+
+def test_corridor_shapes():
+    # Tackler at (0, 0), ballCarrier at (10, 0); points on, beside and behind the line
+    px = np.array([[5., 5., 5., 9., -1., 11.]])
+    py = np.array([[0., 1.5, 3., 1.5, 0., 0.]])
+    coords = [np.array([v]) for v in [0., 0., 10., 0.]]
+
+    np.testing.assert_array_equal(_in_corridor(px, py, *coords, 'box', 2), [[1, 1, 0, 1, 0, 0]])
+    np.testing.assert_array_equal(_in_corridor(px, py, *coords, 'rectangle', 2), [[1, 1, 0, 1, 0, 0]])
+    # Half width of the cone is 1 yard halfway to the ballCarrier and 1.8 yards at x=9
+    np.testing.assert_array_equal(_in_corridor(px, py, *coords, 'cone', 2), [[1, 0, 0, 1, 0, 0]])
+
+
+def test_unknown_corridor(synthetic):
+    tracking, _, x = synthetic
+    with pytest.raises(ValueError):
+        num_offensive_players_between_batch(x, tracking, 'circle')
+
+
+def test_feature_names_do_not_collide():
+    names = {feature_name(corridor, half_width) for corridor in CORRIDORS for half_width in [1, 2, 2.5]}
+    assert len(names) == 9
+    assert feature_name() == 'num_off_player_between'
@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+
+import play_index
+from play_index import PlayMetadata, load_play_index, _LRUCache
+
+
+def _write_data(data_dir, tracking, plays, weeks):
+    for week, gameIds in weeks.items():
+        tracking[tracking.gameId.isin(gameIds)].to_csv(data_dir / f'tracking_week_{week}.csv', index=False)
+    plays.to_csv(data_dir / 'plays.csv', index=False)
+    pd.DataFrame({'gameId': plays.gameId.unique(), 'week': 1}).to_csv(data_dir / 'games.csv', index=False)
+
+
+def test_sidecar_is_rebuilt_when_a_source_changes(synthetic, tmp_path, monkeypatch):
+    tracking, plays, _ = synthetic
+    game1, game2 = sorted(tracking.gameId.unique())
+    _write_data(tmp_path, tracking, plays, {1: [game1]})
+    sidecar = str(tmp_path / 'play_index.pkl')
+
+    builds = []
+    build_play_index = play_index.build_play_index
+    monkeypatch.setattr(play_index, 'build_play_index', lambda *args: builds.append(args) or build_play_index(*args))
+    args = (str(tmp_path), str(tmp_path / 'store'), sidecar, [1, 2])
+
+    assert load_play_index(*args)['game_weeks'] == {game1: 1}
+    assert load_play_index(*args)['game_weeks'] == {game1: 1}
+    assert len(builds) == 1
+
+    # A new week file and a touched plays.csv both invalidate the sidecar
+    _write_data(tmp_path, tracking, plays, {2: [game2]})
+    assert load_play_index(*args)['game_weeks'] == {game1: 1, game2: 2}
+    assert len(builds) == 2
+
+    mtime = os.path.getmtime(tmp_path / 'plays.csv')
+    os.utime(tmp_path / 'plays.csv', (mtime + 10, mtime + 10))
+    index = load_play_index(*args)
+    assert len(builds) == 3 and len(index['plays']) == len(plays)
+    load_play_index(*args)
+    assert len(builds) == 3
+
+
+def test_predictions_reload_when_the_file_changes(synthetic, tmp_path):
+    tracking, plays, _ = synthetic
+    _write_data(tmp_path, tracking, plays, {1: sorted(tracking.gameId.unique())})
+    path = tmp_path / 'predictions.pkl'
+    play = plays.iloc[0]
+    pd.DataFrame({'gameId': [play.gameId], 'playId': [play.playId], 'pred_playResult': [1.]}).to_pickle(path)
+
+    metadata = PlayMetadata(str(tmp_path), str(tmp_path / 'store'), str(tmp_path / 'play_index.pkl'), str(path))
+    assert metadata.predictions(play.gameId, play.playId)['pred_playResult'].tolist() == [1.]
+    assert metadata.play_info(play.gameId, play.playId)['ballCarrierId'] == play.ballCarrierId
+
+    pd.DataFrame({'gameId': [play.gameId], 'playId': [play.playId], 'pred_playResult': [2.]}).to_pickle(path)
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    assert metadata.predictions(play.gameId, play.playId)['pred_playResult'].tolist() == [2.]
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = _LRUCache(2)
+    computed = []
+    def get(key):
+        return cache.get(key, lambda: computed.append(key) or key.upper())
+
+    assert [get('a'), get('b'), get('a')] == ['A', 'B', 'A']
+    get('c') # evicts 'b', 'a' was used more recently
+    assert computed == ['a', 'b', 'c']
+    get('a')
+    assert computed == ['a', 'b', 'c']
+    get('b') # evicts 'c', the hit on 'a' made it the most recently used entry
+    get('a')
+    assert computed == ['a', 'b', 'c', 'b']
+    get('c')
+    assert computed == ['a', 'b', 'c', 'b', 'c']
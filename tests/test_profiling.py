@@ -0,0 +1,34 @@
+import numpy as np
+
+import profiling
+from profiling import Profiler
+
+
+def test_stage_records_rows_and_memory():
+    profiler = Profiler()
+    with profiler.stage('outer', rows_in=10) as outer:
+        with profiler.stage('inner'):
+            values = np.ones(1_000_000)
+        outer.rows_out = len(values)
+
+    outer, inner = profiler.stages
+    assert (outer.depth, inner.depth) == (0, 1)
+    assert (outer.rows_in, outer.rows_out) == (10, 1_000_000)
+    assert outer.wall_s >= inner.wall_s >= 0
+    # The process peak never goes down, a stage can only raise it
+    assert outer.process_peak_rss_mb >= inner.process_peak_rss_mb > 0
+    assert outer.peak_rss_increase_mb >= inner.peak_rss_increase_mb >= 0
+
+
+def test_without_resource_module(monkeypatch, capsys):
+    # Windows has no resource module: stages are still timed, memory is left empty
+    monkeypatch.setattr(profiling, 'resource', None)
+    profiler = Profiler()
+    with profiler.stage('load', rows_in=5):
+        pass
+
+    record = profiler.stages[0]
+    assert record.wall_s is not None and record.cpu_s is not None
+    assert record.process_peak_rss_mb is None and record.peak_rss_increase_mb is None
+    profiler.summary()
+    assert 'load' in capsys.readouterr().out
@@ -0,0 +1,51 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+import plotter2
+import render_plays
+from tracking_store import write_tracking_store, week_store_path
+
+
+class FailingAnimator():
+    """Creates the field figure like animate_play, then fails."""
+    def animate_play(self, gameId, playId, tacklerId, interval=100):
+        plt.subplots()
+        raise RuntimeError('no predictions for this play')
+
+
+def test_failed_render_closes_its_figure(tmp_path):
+    figures_before = plt.get_fignums()
+    with pytest.raises(RuntimeError):
+        render_plays.render_play(FailingAnimator(), 1, 2, 3, str(tmp_path / 'play.gif'))
+    assert plt.get_fignums() == figures_before
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_preload_week_from_store(synthetic, tmp_path, monkeypatch):
+    tracking = synthetic[0]
+    monkeypatch.setattr(plotter2, 'TRACKING_STORE_DIR', str(tmp_path))
+    write_tracking_store(tracking, week_store_path(1, str(tmp_path)), compact=False)
+
+    animator = plotter2.NflPlayAnimator()
+    animator.preload_week(1)
+    animator.gameId_dict = {gameId: 1 for gameId in tracking.gameId.unique()}
+
+    gameId, playId = tracking.gameId.iloc[0], tracking.playId.iloc[0]
+    play = animator.load_play_data(gameId, playId)
+    expected = tracking.query('gameId==@gameId & playId==@playId').sort_values('nflId', kind='stable')
+    assert len(play) == len(expected)
+    np.testing.assert_array_equal(play.sort_values('nflId', kind='stable')['x'].to_numpy(), expected['x'].to_numpy())
+
+
+def test_unknown_game_is_skipped(tmp_path, monkeypatch):
+    class Metadata():
+        game_weeks = {}
+
+    class Animator():
+        metadata = Metadata()
+
+    monkeypatch.setattr(render_plays, 'NflPlayAnimator', Animator)
+    results = render_plays.render_plays([(1, 2, 3)], str(tmp_path), workers=1)
+    assert results[['gameId', 'playId', 'tacklerId']].values.tolist() == [[1, 2, 3]]
+    assert 'not in games.csv' in results['error'].iat[0]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sequence_data import RaggedSequences, length_buckets, bucket_batches, n_batches, frame_index, PADDING_VALUE
+
+FEATURE_COLS = ['f1', 'f2']
+
+
+@pytest.fixture
+def data(synthetic):
+    """Model rows like `data` of model.ipynb: sorted by sequence and frame, with features, playResult and week."""
+    x = synthetic[2]
+    rng = np.random.default_rng(0)
+    data = x[['gameId', 'playId', 'frameId', 'tacklerId']].assign(
+        f1=rng.normal(size=len(x)), f2=rng.normal(size=len(x)), playResult=rng.integers(-3, 20, len(x)).astype(float),
+        week=(x['gameId'] - x['gameId'].min() + 1))
+    return data.sort_values(['gameId', 'playId', 'tacklerId', 'frameId'], ignore_index=True)
+
+
+def prepare_data(data, max_len, padding_value):
+    """prepare_data of model.ipynb with the pad_sequences defaults (post padding, pre truncation) in NumPy."""
+    X, Y = [], []
+    for _, group in data.groupby(['gameId', 'playId', 'tacklerId']):
+        x_seq = group[FEATURE_COLS].to_numpy(dtype='float32')[-max_len:]
+        y_seq = group['playResult'].to_numpy(dtype='float32')[-max_len:]
+        X.append(np.pad(x_seq, ((0, max_len - len(x_seq)), (0, 0)), constant_values=padding_value))
+        Y.append(np.pad(y_seq, (0, max_len - len(y_seq)), constant_values=padding_value))
+    return np.stack(X), np.stack(Y)[..., None]
+
+
+@pytest.mark.parametrize('max_len', [None, 70, 35])
+def test_pad_matches_prepare_data(data, max_len):
+    seqs = RaggedSequences.from_frame(data, FEATURE_COLS, key_cols=['gameId', 'playId', 'tacklerId', 'week'])
+    X, Y = seqs.pad(max_len=max_len)
+
+    X_ref, Y_ref = prepare_data(data, max_len or int(seqs.lengths.max()), PADDING_VALUE)
+    np.testing.assert_array_equal(X, X_ref)
+    np.testing.assert_array_equal(Y, Y_ref)
+
+
+def test_subset_and_round_trip(data, tmp_path):
+    seqs = RaggedSequences.from_frame(data, FEATURE_COLS, key_cols=['gameId', 'playId', 'tacklerId', 'week'])
+    later = seqs.subset(seqs.keys.week > 1)
+
+    X, Y = later.pad(max_len=int(seqs.lengths.max()))
+    X_ref, Y_ref = prepare_data(data[data.week > 1], int(seqs.lengths.max()), PADDING_VALUE)
+    np.testing.assert_array_equal(X, X_ref)
+    np.testing.assert_array_equal(Y, Y_ref)
+
+    later.save(tmp_path / 'seqs.npz')
+    loaded = RaggedSequences.load(tmp_path / 'seqs.npz')
+    for attr in ['features', 'targets', 'offsets']:
+        np.testing.assert_array_equal(getattr(loaded, attr), getattr(later, attr))
+    pd.testing.assert_frame_equal(loaded.keys, later.keys, check_dtype=False)
+
+
+def test_length_buckets_cover_every_sequence_once(data):
+    seqs = RaggedSequences.from_frame(data, FEATURE_COLS)
+    for shuffle in [False, True]:
+        batches = length_buckets(seqs, batch_size=2, n_buckets=3, shuffle=shuffle, seed=1)
+        assert sorted(np.concatenate(batches)) == list(range(len(seqs)))
+        assert all(len(batch) <= 2 for batch in batches)
+    assert n_batches(seqs, batch_size=2, n_buckets=3) == len(batches)
+
+    # One epoch of batches holds every frame once, each batch padded to its longest sequence
+    epoch = list(bucket_batches(seqs, batch_size=2, n_buckets=3, repeat=False, seed=1))
+    assert sum((Y != PADDING_VALUE).sum() for _, Y in epoch) == len(data)
+    assert all((Y[:, -1] != PADDING_VALUE).any() for _, Y in epoch)
+    np.testing.assert_array_equal(frame_index(seqs.offsets, np.arange(len(seqs))), np.arange(len(data)))
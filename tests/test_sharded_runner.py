@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sharded_runner import run_sharded, tracking_store_path, feature_tracking_path
+from num_offensive_player_between import num_offensive_players_between_batch, TRACKING_COLS
+from nearest_defenders_and_offesnive import find_closest_players_and_ballcarrier_indicator_batch
+from tracking_store import TrackingStore, numpy_dtypes, write_tracking_store
+
+
+def test_run_sharded_on_int32_pickle(synthetic, tmp_path):
+    tracking, _, x = synthetic
+    # nflId as load_tracking reads it: nullable Int32 with NA for the football
+    tracking_int32 = tracking.assign(nflId=tracking['nflId'].astype('Int32'))
+    tracking_int32.to_pickle(tmp_path / 'tracking_new.pkl')
+
+    results = run_sharded(x, str(tmp_path / 'tracking_new.pkl'), num_offensive_players_between_batch, 'num_off',
+                          str(tmp_path / 'checkpoints'), tracking_columns=TRACKING_COLS, workers=1, games_per_shard=1)
+    expected = num_offensive_players_between_batch(x, tracking)
+    np.testing.assert_array_equal(results['num_off_player_between'].to_numpy(), expected.to_numpy())
+
+    store = TrackingStore(tracking_store_path(str(tmp_path / 'tracking_new.pkl'), str(tmp_path / 'checkpoints')))
+    assert store.to_dataframe(['nflId'])['nflId'].dtype == 'float64'
+
+
+def test_numpy_dtypes():
+    df = pd.DataFrame({'nflId': pd.array([1, None], dtype='Int32'), 'flag': pd.array([True, None], dtype='boolean'),
+                       'club': pd.Categorical(['KC', 'football']), 'x': np.array([1., 2.], dtype='float32')})
+    converted = numpy_dtypes(df)
+    assert converted.dtypes.astype(str).tolist() == ['float64', 'float64', 'category', 'float32']
+    assert np.isnan(converted['nflId'].iloc[1]) and np.isnan(converted['flag'].iloc[1])
+
+
+def test_run_sharded_on_store_matches_pickle(synthetic, tmp_path):
+    tracking, _, x = synthetic
+    tracking.to_pickle(tmp_path / 'tracking_new.pkl')
+    write_tracking_store(tracking, str(tmp_path / 'store'), compact=False)
+    write_tracking_store(tracking, str(tmp_path / 'compact_store'))
+
+    def run(tracking_path, name):
+        return run_sharded(x, tracking_path, find_closest_players_and_ballcarrier_indicator_batch, name,
+                           str(tmp_path / 'checkpoints'), tracking_columns=TRACKING_COLS, workers=1, games_per_shard=1)
+
+    pd.testing.assert_frame_equal(run(str(tmp_path / 'store'), 'store'), run(str(tmp_path / 'tracking_new.pkl'), 'pickle'))
+
+    # Compact stores would change the features: the scripts fall back to the pickle and run_sharded refuses them
+    assert TrackingStore(str(tmp_path / 'compact_store')).compact
+    assert feature_tracking_path(str(tmp_path / 'compact_store'), 'tracking_new.pkl') == 'tracking_new.pkl'
+    assert feature_tracking_path(str(tmp_path / 'store'), 'tracking_new.pkl') == str(tmp_path / 'store')
+    assert feature_tracking_path(str(tmp_path / 'missing'), 'tracking_new.pkl') == 'tracking_new.pkl'
+    with pytest.raises(ValueError):
+        run(str(tmp_path / 'compact_store'), 'compact')
@@ -0,0 +1,82 @@
+import shutil
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from play_frames import frame_positions, frame_values
+from sprite_renderer import SpriteRenderer, write_frames, _forward_fill
+
+
+def play_arrays(df, play, n_frames):
+    """The arrays of NflPlayAnimator._frame_arrays for one synthetic play."""
+    not_ids = ~df.nflId.isin([play.tacklerId, play.ballCarrierId])
+    t2 = df.loc[(df.club != play.possessionTeam) & (df.club != 'football'), 'club'].iat[0]
+    return {
+        't1': frame_positions(df, (df.club == play.possessionTeam) & not_ids, n_frames),
+        't2': frame_positions(df, (df.club == t2) & not_ids, n_frames),
+        'ball': frame_positions(df, df.club == 'football', n_frames),
+        'tackler': frame_positions(df, df.nflId == play.tacklerId, n_frames),
+        'ballCarrier': frame_positions(df, df.nflId == play.ballCarrierId, n_frames),
+        'pred_tackle_line': frame_values(df.frameId[df.frameId > 3], df.x[df.frameId > 3], n_frames),
+    }
+
+
+@pytest.fixture
+def play_data(synthetic):
+    tracking, plays, _ = synthetic
+    play = plays.iloc[0]
+    df = tracking.query('gameId==@play.gameId & playId==@play.playId')
+    return df, play, int(df.frameId.max()) + 1
+
+
+def test_forward_fill():
+    values = np.array([[np.nan, np.nan], [1., 2.], [np.nan, np.nan], [np.nan, np.nan], [3., 4.]])
+    np.testing.assert_array_equal(_forward_fill(values), [[np.nan, np.nan], [1., 2.], [1., 2.], [1., 2.], [3., 4.]])
+    np.testing.assert_array_equal(_forward_fill([np.nan, 5., np.nan]), [np.nan, 5., 5.])
+
+
+def test_frames(play_data):
+    df, play, n_frames = play_data
+    renderer = SpriteRenderer(dpi=30)
+    lines = {'los': play.absoluteYardlineNumber, 'first_down': play.absoluteYardlineNumber + 10, 'actual_tackle': np.nan}
+    frames = list(renderer.frames(play_arrays(df, play, n_frames), lines, n_frames))
+
+    assert len(frames) == n_frames
+    assert all(frame.shape == (renderer.height, renderer.width, 3) and frame.dtype == 'uint8' for frame in frames)
+    assert renderer.height % 2 == 0 and renderer.width % 2 == 0
+    assert not np.array_equal(frames[1], frames[-1])
+
+    # A tackler missing from a frame is drawn where it was in the previous frame
+    tackler = df.nflId == play.tacklerId
+    missing = df[~(tackler & (df.frameId == 10))]
+    previous = df[tackler & (df.frameId == 9)][['x', 'y']].to_numpy()
+    held = df.copy()
+    held.loc[tackler & (df.frameId == 10), ['x', 'y']] = previous
+    frames_missing = list(renderer.frames(play_arrays(missing, play, n_frames), lines, n_frames))
+    frames_held = list(renderer.frames(play_arrays(held, play, n_frames), lines, n_frames))
+    np.testing.assert_array_equal(frames_missing[10], frames_held[10])
+    assert not np.array_equal(frames_missing[10], frames[10])
+
+
+def test_write_gif(play_data, tmp_path):
+    df, play, n_frames = play_data
+    renderer = SpriteRenderer(dpi=30)
+    frames = list(renderer.frames(play_arrays(df, play, n_frames), {'los': play.absoluteYardlineNumber}, n_frames))
+    write_frames(iter(frames), str(tmp_path / 'play.gif'), fps=10)
+
+    with Image.open(tmp_path / 'play.gif') as gif:
+        assert gif.n_frames == n_frames
+        assert gif.size == (renderer.width, renderer.height)
+        # The transparent deltas on the shared palette reproduce the frames closely
+        gif.seek(n_frames - 1)
+        last = np.asarray(gif.convert('RGB'), dtype='int64')
+    assert np.abs(last - frames[-1]).mean() < 8
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg is not installed')
+def test_write_mp4(play_data, tmp_path):
+    df, play, n_frames = play_data
+    renderer = SpriteRenderer(dpi=30)
+    write_frames(renderer.frames(play_arrays(df, play, n_frames), {}, n_frames), str(tmp_path / 'play.mp4'))
+    assert (tmp_path / 'play.mp4').stat().st_size > 0
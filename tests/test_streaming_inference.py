@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import REGISTRY
+from feature_cache import FeatureCache, build_features
+from streaming_inference import LstmStepper, StreamingPredictor, FEATURE_COLS, replay
+from synthetic import make_x
+from tracking_loader import normalize_play_direction
+
+
+def _random_lstm(n_features, units=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return LstmStepper(rng.normal(0, .3, (n_features, 4 * units)), rng.normal(0, .3, (units, 4 * units)),
+                       rng.normal(0, .1, 4 * units), rng.normal(0, 1, (units, 1)), rng.normal(0, 1, 1), mask_value=0.)
+
+
+@pytest.mark.parametrize('missing_frames', [0, 3])
+def test_replay_matches_offline_predictions(synthetic, tmp_path, missing_frames):
+    tracking, plays, _ = synthetic
+    if missing_frames:
+        # The tackler of the first play is not tracked in a few frames, which have no row in x (like model.ipynb)
+        play = plays.iloc[0]
+        missing = ((tracking.gameId == play.gameId) & (tracking.playId == play.playId) & (tracking.nflId == play.tacklerId)
+                   & tracking.frameId.isin([5, 6, 20][:missing_frames]))
+        tracking = tracking[~missing]
+
+    # Offline: the registered features of the normalized tracking data, one LSTM pass per (play, tackler)
+    normalized = normalize_play_direction(tracking.copy())
+    x = make_x(normalized, plays).dropna(subset=['x_tackler']).reset_index(drop=True)
+    x = build_features(x, REGISTRY, cache=FeatureCache(str(tmp_path / 'cache')), tracking=normalized)
+    features = x[FEATURE_COLS].to_numpy(dtype='float64')
+    finite = np.where(np.isfinite(features), features, np.nan)
+    mean, scale = np.nanmean(finite, axis=0), np.nanstd(finite, axis=0) + 1
+
+    lstm = _random_lstm(len(FEATURE_COLS))
+    scaled = (features - mean) / scale
+    scaled[~np.isfinite(scaled)] = 0
+    offline = np.empty(len(x))
+    for rows in x.groupby(['gameId', 'playId', 'tacklerId']).indices.values():
+        rows = rows[np.argsort(x['frameId'].to_numpy()[rows], kind='stable')]
+        offline[rows] = lstm.predict(scaled[rows][None])[0]
+
+    # Streaming: raw frames (plays going left are mirrored by the predictor) with the line of scrimmage of plays.csv
+    raw_plays = plays.merge(tracking.drop_duplicates(['gameId', 'playId'])[['gameId', 'playId', 'playDirection']])
+    left = (raw_plays['playDirection'] == 'left').to_numpy()
+    raw_plays.loc[left, 'absoluteYardlineNumber'] = 110 - raw_plays.loc[left, 'absoluteYardlineNumber']
+    streamed = replay(StreamingPredictor(lstm, mean, scale), tracking, raw_plays)
+
+    merged = x[['gameId', 'playId', 'frameId', 'tacklerId']].assign(offline=offline).merge(
+        streamed, on=['gameId', 'playId', 'frameId', 'tacklerId'], validate='1:1')
+    assert len(merged) == len(x)
+    assert streamed['pred_playResult'].isna().sum() == missing_frames
+    np.testing.assert_allclose(merged['pred_playResult'], merged['offline'], rtol=1e-6, atol=1e-9)
+
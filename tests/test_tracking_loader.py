@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from tracking_loader import load_tracking, play_key, TRACKING_DTYPES
+
+
+def test_play_key_matches_string_key():
+    gameId = np.array([2022090800, 2022090800, 2022090800, 2022091113, 2022110700, 2023010800])
+    playId = np.array([1, 9, 10, 99, 100, 4012])
+    expected = (pd.Series(gameId).astype(str) + pd.Series(playId).astype(str)).astype(int).to_numpy()
+    np.testing.assert_array_equal(play_key(gameId, playId), expected)
+
+
+def test_load_tracking_round_trip(synthetic, tmp_path):
+    tracking = synthetic[0]
+    # One game per week, written like tracking_week_N.csv
+    for week, (_, df_week) in enumerate(tracking.groupby('gameId'), start=1):
+        df_week.to_csv(tmp_path / f'tracking_week_{week}.csv', index=False)
+
+    # Small chunks, so that chunks and weeks have different categories
+    df_tracking = load_tracking(str(tmp_path), weeks=[1, 2], chunksize=500, verbose=False)
+    csv = pd.concat([pd.read_csv(tmp_path / f'tracking_week_{week}.csv') for week in [1, 2]], ignore_index=True)
+
+    assert df_tracking.columns.tolist() == ['key'] + csv.columns.tolist()
+    for col, dtype in TRACKING_DTYPES.items():
+        assert str(df_tracking[col].dtype) == dtype, col
+    for col in ['displayName', 'time', 'club', 'playDirection', 'event']:
+        pd.testing.assert_series_equal(df_tracking[col].astype(object), csv[col].astype(object), check_names=False)
+    np.testing.assert_array_equal(df_tracking['nflId'].to_numpy(dtype='float64', na_value=np.nan), csv['nflId'])
+    np.testing.assert_allclose(df_tracking['x'], csv['x'], rtol=1e-6)
+    np.testing.assert_array_equal(df_tracking['key'], (csv['gameId'].astype(str) + csv['playId'].astype(str)).astype(int))
+
+    # normalize=True mirrors the plays going left like the normalization cell of model.ipynb
+    normalized = load_tracking(str(tmp_path), weeks=[1, 2], normalize=True, chunksize=500, verbose=False)
+    left_condition = csv['playDirection'] == 'left'
+    csv.loc[left_condition, 'x'] = 110 - csv.loc[left_condition, 'x']
+    csv.loc[left_condition, 'y'] = 53.3 - csv.loc[left_condition, 'y']
+    assert left_condition.any() and (~left_condition).any()
+    np.testing.assert_allclose(normalized['x'], csv['x'], rtol=1e-6)
+    np.testing.assert_allclose(normalized['y'], csv['y'], rtol=1e-6, atol=1e-5)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from tracking_store import TrackingStore, write_tracking_store, convert_tracking_csvs, available_weeks, week_store_path
+
+
+@pytest.fixture
+def tracking(synthetic):
+    df = synthetic[0].copy()
+    df['time'] = pd.to_datetime(df['time'])
+    return df
+
+
+def test_round_trip(tracking, tmp_path):
+    write_tracking_store(tracking, tmp_path / 'store', compact=False)
+    store = TrackingStore(tmp_path / 'store')
+
+    loaded = store.to_dataframe()
+    assert len(store) == len(tracking)
+    assert list(store.game_ids()) == sorted(tracking.gameId.unique())
+    for col in ['gameId', 'playId', 'nflId', 'frameId', 'x', 'y', 'time']:
+        np.testing.assert_array_equal(loaded[col].to_numpy(), tracking[col].to_numpy())
+    assert (loaded['club'].astype(str).to_numpy() == tracking['club'].to_numpy()).all()
+
+    gameId, playId = tracking.gameId.iloc[-1], tracking.playId.iloc[-1]
+    play = tracking.query('gameId==@gameId & playId==@playId').reset_index(drop=True)
+    tm.assert_frame_equal(store.load_play(gameId, playId, columns=['frameId', 'x']), play[['frameId', 'x']])
+    assert len(store.load_games([gameId])) == (tracking.gameId == gameId).sum()
+
+
+def test_nullable_columns(tracking, tmp_path):
+    # nflId as load_tracking reads it (Int32 with NA for the football) and a nullable boolean column
+    tracking['nflId'] = tracking['nflId'].astype('Int32')
+    tracking['flag'] = pd.array(np.where(tracking['x'] > 60, True, None), dtype='boolean')
+
+    for compact in [False, True]:
+        path = tmp_path / f'store_{compact}'
+        write_tracking_store(tracking, path, compact=compact)
+        loaded = TrackingStore(path).to_dataframe()
+        np.testing.assert_array_equal(loaded['nflId'].to_numpy(dtype='float64'),
+                                      tracking['nflId'].to_numpy(dtype='float64', na_value=np.nan))
+        np.testing.assert_array_equal(loaded['flag'].to_numpy(), tracking['flag'].to_numpy(dtype='float64', na_value=np.nan))
+
+
+def test_convert_available_weeks(synthetic, tmp_path):
+    tracking = synthetic[0]
+    tracking[tracking.gameId == tracking.gameId.min()].to_csv(tmp_path / 'tracking_week_2.csv', index=False)
+
+    weeks = available_weeks(tmp_path)
+    assert weeks == [2]
+    convert_tracking_csvs(tmp_path, tmp_path / 'store', weeks)
+    assert len(TrackingStore(week_store_path(2, tmp_path / 'store'))) == (tracking.gameId == tracking.gameId.min()).sum()
+
+
+def test_pickle_cli_keeps_float64(synthetic, tmp_path, monkeypatch):
+    import tracking_store
+    from nearest_defenders_and_offesnive import find_closest_players_and_ballcarrier_indicator_batch
+
+    tracking, _, x = synthetic
+    tracking.to_pickle(tmp_path / 'tracking_new.pkl')
+    monkeypatch.setattr('sys.argv', ['tracking_store.py', '--pickle', str(tmp_path / 'tracking_new.pkl'),
+                                     '--out', str(tmp_path / 'store')])
+    tracking_store.main()
+
+    loaded = TrackingStore(tmp_path / 'store').to_dataframe()
+    assert loaded['x'].dtype == 'float64'
+    tm.assert_frame_equal(find_closest_players_and_ballcarrier_indicator_batch(x, loaded),
+                          find_closest_players_and_ballcarrier_indicator_batch(x, tracking))
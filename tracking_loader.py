@@ -0,0 +1,102 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from profiling import peak_rss_mb, profiled
+
+
+WEEK_START = 1
+WEEK_END = 9
+
+# Explicit compact dtypes of tracking_week_N.csv
+TRACKING_DTYPES = {
+    'gameId': 'int32',
+    'playId': 'int32',
+    'nflId': 'Int32',          # nullable, the football has no nflId
+    'displayName': 'category',
+    'frameId': 'int16',
+    'time': 'category',
+    'jerseyNumber': 'float32',
+    'club': 'category',
+    'playDirection': 'category',
+    'x': 'float32',
+    'y': 'float32',
+    's': 'float32',
+    'a': 'float32',
+    'dis': 'float32',
+    'o': 'float32',
+    'dir': 'float32',
+    'event': 'category',
+}
+
+
+def play_key(gameId, playId):
+    """
+    Integer play key equal to int(str(gameId) + str(playId)), computed with integer arithmetic:
+    gameId shifted left by the number of decimal digits of playId.
+    """
+    gameId = np.asarray(gameId, dtype='int64')
+    playId = np.asarray(playId, dtype='int64')
+    n_digits = np.ones_like(playId)
+    for power in range(1, 10):
+        n_digits += playId >= 10**power
+    return gameId * 10**n_digits + playId
+
+
+def add_play_key(df):
+    """Insert the 'key' column of the notebook as the first column of df."""
+    df.insert(0, 'key', play_key(df['gameId'].to_numpy(), df['playId'].to_numpy()))
+    return df
+
+
+def normalize_play_direction(df):
+    """Mirror plays going left, so that all plays go towards the right."""
+    left_condition = (df['playDirection'] == 'left').to_numpy()
+    df.loc[left_condition, 'x'] = 110 - df.loc[left_condition, 'x']
+    df.loc[left_condition, 'y'] = 53.3 - df.loc[left_condition, 'y']
+    return df
+
+
+def _concat_chunks(chunks):
+    """Concatenate chunks, unifying categorical columns so they stay categorical instead of becoming object."""
+    categorical_cols = [col for col, dtype in chunks[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    categoricals = {col: union_categoricals([chunk[col] for chunk in chunks]) for col in categorical_cols}
+    for chunk in chunks:
+        for col in categorical_cols:
+            chunk[col] = chunk[col].cat.set_categories(categoricals[col].categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+@profiled()
+def load_tracking(data_dir='data', weeks=range(WEEK_START, WEEK_END+1), normalize=False, add_key=True,
+                  usecols=None, chunksize=1_000_000, verbose=True):
+    """
+    Stream tracking_week_N.csv in chunks with compact dtypes into a single DataFrame. The play 'key' is
+    added and, with normalize=True, plays going left are mirrored while streaming (as in the notebook).
+    Chunks are concatenated once at the end instead of growing the DataFrame week by week.
+    """
+    start = time.perf_counter()
+    dtypes = {col: dtype for col, dtype in TRACKING_DTYPES.items() if usecols is None or col in usecols}
+
+    chunks = []
+    for week in weeks:
+        file_name = os.path.join(data_dir, f'tracking_week_{week}.csv')
+        for chunk in pd.read_csv(file_name, dtype=dtypes, usecols=usecols, chunksize=chunksize):
+            if normalize:
+                normalize_play_direction(chunk)
+            chunks.append(chunk)
+
+    df_tracking = _concat_chunks(chunks)
+    del chunks
+    if add_key:
+        add_play_key(df_tracking)
+
+    if verbose:
+        size_mb = df_tracking.memory_usage(deep=True).sum() / 1024**2
+        peak = peak_rss_mb()
+        print(f'Loaded {len(df_tracking):,} tracking rows ({size_mb:,.0f} MB) in {time.perf_counter() - start:.1f}s'
+              + ('' if peak is None else f', process peak RSS {peak:,.0f} MB'))
+    return df_tracking
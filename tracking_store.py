@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+WEEK_START = 1
+WEEK_END = 9
+
+STORE_DIR = 'data/tracking_store'
+
+# Compact on-disk dtypes of the tracking_week_N.csv columns, all other columns are inferred
+TRACKING_DTYPES = {
+    'gameId': 'int32',
+    'playId': 'int32',
+    'nflId': 'float32',        # float because the football has no nflId
+    'frameId': 'int16',
+    'jerseyNumber': 'float32',
+    'x': 'float32',
+    'y': 'float32',
+    's': 'float32',
+    'a': 'float32',
+    'dis': 'float32',
+    'o': 'float32',
+    'dir': 'float32',
+}
+CATEGORICAL_COLS = ['displayName', 'club', 'playDirection', 'event']
+DATETIME_COLS = ['time']
+
+
+def week_store_path(week, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f'week_{week}')
+
+
+def _numeric_array(values, dtype=None):
+    """NumPy array of a numeric column. Nullable extension columns (e.g. Int32, boolean) become float64 with NaN."""
+    if not isinstance(values.dtype, np.dtype):
+        return values.to_numpy(dtype='float64', na_value=np.nan).astype(dtype or 'float64')
+    return values.to_numpy(dtype=dtype or values.dtype)
+
+
+def numpy_dtypes(df):
+    """
+    df with nullable extension columns (e.g. nflId as Int32 from load_tracking) as float64 with NaN, the
+    dtypes the feature_gen scripts were written for. Categorical and object columns are kept.
+    """
+    nullable = [col for col, dtype in df.dtypes.items()
+                if not isinstance(dtype, (np.dtype, pd.CategoricalDtype)) and (pd.api.types.is_numeric_dtype(dtype)
+                                                                             or pd.api.types.is_bool_dtype(dtype))]
+    if len(nullable) == 0:
+        return df
+    return df.assign(**{col: df[col].to_numpy(dtype='float64', na_value=np.nan) for col in nullable})
+
+
+def available_weeks(data_dir='data', weeks=range(WEEK_START, WEEK_END+1)):
+    """Weeks of which data_dir holds a tracking_week_N.csv."""
+    return [week for week in weeks if os.path.exists(os.path.join(data_dir, f'tracking_week_{week}.csv'))]
+
+
+def write_tracking_store(df, path, compact=True):
+    """
+    Write a tracking DataFrame to a columnar store directory:
+      <col>.npy   one array per column (categoricals as int16 codes, datetimes as int64 ns)
+      index.npy   (gameId, playId, start, stop) row range of every play
+      meta.json   column dtypes and categories and whether the store is compact, written last so its presence
+                  marks a complete store
+    Rows are grouped by play, keeping their original order within a play. With compact=False numeric
+    columns keep their dtype instead of being cast to TRACKING_DTYPES (e.g. float64 coordinates), except
+    nullable extension columns, which are stored as float64 with NaN.
+    """
+    os.makedirs(path, exist_ok=True)
+    df = df.sort_values(['gameId', 'playId'], kind='stable').reset_index(drop=True)
+
+    meta = {'n_rows': len(df), 'compact': compact, 'columns': {}}
+    for col in df.columns:
+        values = df[col]
+        if col in CATEGORICAL_COLS or values.dtype == object or isinstance(values.dtype, pd.CategoricalDtype):
+            cat = values.astype('category')
+            arr = cat.cat.codes.to_numpy().astype('int16')
+            meta['columns'][col] = {'kind': 'category', 'categories': cat.cat.categories.tolist()}
+        elif col in DATETIME_COLS or pd.api.types.is_datetime64_any_dtype(values):
+            arr = pd.to_datetime(values).to_numpy().astype('datetime64[ns]').view('int64')
+            meta['columns'][col] = {'kind': 'datetime'}
+        else:
+            arr = _numeric_array(values, TRACKING_DTYPES.get(col) if compact else None)
+            meta['columns'][col] = {'kind': 'numeric'}
+        np.save(os.path.join(path, f'{col}.npy'), arr)
+
+    # Row range of every (gameId, playId)
+    gameIds, playIds = df['gameId'].to_numpy(), df['playId'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, (gameIds[1:] != gameIds[:-1]) | (playIds[1:] != playIds[:-1])])
+    stops = np.r_[starts[1:], len(df)]
+    index = np.empty(len(starts), dtype=[('gameId', 'int64'), ('playId', 'int64'), ('start', 'int64'), ('stop', 'int64')])
+    index['gameId'], index['playId'], index['start'], index['stop'] = gameIds[starts], playIds[starts], starts, stops
+    np.save(os.path.join(path, 'index.npy'), index)
+
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+def convert_tracking_csvs(data_dir='data', store_dir=STORE_DIR, weeks=range(WEEK_START, WEEK_END+1)):
+    """One-time conversion of data/tracking_week_N.csv into one store per week."""
+    for week in weeks:
+        dtypes = dict(TRACKING_DTYPES)
+        dtypes.update({col: 'category' for col in CATEGORICAL_COLS})
+        df = pd.read_csv(os.path.join(data_dir, f'tracking_week_{week}.csv'), dtype=dtypes, parse_dates=DATETIME_COLS)
+        write_tracking_store(df, week_store_path(week, store_dir))
+
+
+class TrackingStore():
+    """
+    Read side of a store written by write_tracking_store. Columns are memory-mapped, so slicing a play
+    only touches the rows of that play.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.columns = list(self.meta['columns'])
+        self._arrays = {col: np.load(os.path.join(path, f'{col}.npy'), mmap_mode='r') for col in self.columns}
+
+        self.index = np.load(os.path.join(path, 'index.npy'))
+        self._play_rows = {(gid, pid): (start, stop) for gid, pid, start, stop in self.index.tolist()}
+
+    def __len__(self):
+        return self.meta['n_rows']
+
+    @property
+    def compact(self):
+        """Whether numeric columns were cast to TRACKING_DTYPES, stores written before this was recorded count as compact."""
+        return self.meta.get('compact', True)
+
+    def game_ids(self):
+        return np.unique(self.index['gameId'])
+
+    def plays(self):
+        """DataFrame with the gameId, playId and row range of every play in the store."""
+        return pd.DataFrame(self.index)
+
+    def _to_dataframe(self, rows, columns=None):
+        data = {}
+        for col in columns or self.columns:
+            arr = np.asarray(self._arrays[col][rows])
+            info = self.meta['columns'][col]
+            if info['kind'] == 'category':
+                data[col] = pd.Categorical.from_codes(arr, categories=info['categories'])
+            elif info['kind'] == 'datetime':
+                data[col] = arr.view('datetime64[ns]')
+            else:
+                data[col] = arr
+        return pd.DataFrame(data)
+
+    def load_play(self, gameId, playId, columns=None):
+        start, stop = self._play_rows[(gameId, playId)]
+        return self._to_dataframe(slice(start, stop), columns)
+
+    def load_plays(self, keys, columns=None):
+        """All rows of the given (gameId, playId) pairs, in the order of keys."""
+        ranges = [self._play_rows[key] for key in keys if key in self._play_rows]
+        rows = np.concatenate([np.arange(start, stop) for start, stop in ranges]) if ranges else np.array([], dtype='int64')
+        return self._to_dataframe(rows, columns)
+
+    def load_games(self, gameIds, columns=None):
+        mask = np.isin(self.index['gameId'], list(gameIds))
+        return self.load_plays(zip(self.index['gameId'][mask].tolist(), self.index['playId'][mask].tolist()), columns)
+
+    def to_dataframe(self, columns=None):
+        return self._to_dataframe(slice(None), columns)
+
+
+def read_tracking(path, columns=None):
+    """Load tracking data from a store directory, or from a .pkl / .csv file."""
+    if os.path.isdir(path):
+        return TrackingStore(path).to_dataframe(columns)
+    if path.endswith('.pkl'):
+        df = pd.read_pickle(path)
+        return df[columns] if columns is not None else df
+    return pd.read_csv(path, usecols=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert tracking data into a memory-mapped columnar store.')
+    parser.add_argument('--data-dir', default='data', help='directory holding tracking_week_N.csv')
+    parser.add_argument('--out', default=STORE_DIR, help='output store directory')
+    parser.add_argument('--weeks', type=int, nargs='+', default=None, help='default: every week with a csv in --data-dir')
+    parser.add_argument('--pickle', help='convert this tracking pickle (e.g. tracking_new.pkl) instead of the weeks')
+    parser.add_argument('--compact', action='store_true',
+                        help='store the --pickle columns as float32 (not for the feature_gen scripts)')
+    args = parser.parse_args()
+
+    if args.pickle:
+        write_tracking_store(pd.read_pickle(args.pickle), args.out, compact=args.compact)
+    else:
+        weeks = args.weeks or available_weeks(args.data_dir)
+        if len(weeks) == 0:
+            raise SystemExit(f'No tracking_week_N.csv in {args.data_dir}')
+        convert_tracking_csvs(args.data_dir, args.out, weeks)
+
+if __name__ == "__main__":
+    main()